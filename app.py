@@ -110,73 +110,98 @@ with col1:
     # Main action button
     if st.button("Get Solution", type="primary", use_container_width=True):
         if question:
-            with st.spinner("🤔 Analyzing your question..."):
-                start_time = time.time()
+            from src.agents.math_agent import stream_solution
+            
+            status = st.empty()
+            status.info("🤔 Analyzing your question...")
+            
+            start_time = time.time()
+            first_token_time = None
+            solution_placeholder = None
+            streamed_solution = ""
+            result = None
+            
+            try:
+                # Stream the workflow, rendering solution tokens as they arrive
+                for kind, payload in stream_solution(st.session_state.workflow, {
+                    "question": question,
+                    "route_decision": "",
+                    "knowledge_base_results": "",
+                    "web_search_results": "",
+                    "context": "",
+                    "solution": "",
+                    "confidence_score": 0.0,
+                    "needs_human_feedback": False,
+                    "guardrail_passed": True,
+                    "error_message": None,
+                    "processing_time": 0.0,
+                    "tokens_used": 0,
+                    "cost_estimate": 0.0
+                }):
+                    if kind == "result":
+                        result = payload
+                        continue
+                    
+                    if solution_placeholder is None:
+                        first_token_time = time.time() - start_time
+                        status.empty()
+                        st.markdown("### 📝 Solution")
+                        solution_placeholder = st.empty()
+                    streamed_solution += payload
+                    solution_placeholder.markdown(streamed_solution + "▌")
+                
+                status.empty()
+                processing_time = time.time() - start_time
+                st.session_state.question_count += 1
                 
-                try:
-                    # Invoke the workflow
-                    result = st.session_state.workflow.invoke({
-                        "question": question,
-                        "route_decision": "",
-                        "knowledge_base_results": "",
-                        "web_search_results": "",
-                        "context": "",
-                        "solution": "",
-                        "confidence_score": 0.0,
-                        "needs_human_feedback": False,
-                        "guardrail_passed": True,
-                        "error_message": None,
-                        "processing_time": 0.0,
-                        "tokens_used": 0,
-                        "cost_estimate": 0.0
-                    })
+                # Store result for feedback
+                st.session_state.last_result = result
+                st.session_state.last_question = question
+                
+                # Check if guardrails passed
+                if not result.get("guardrail_passed", True):
+                    st.error(f"⚠️ {result.get('error_message', 'Question not appropriate')}")
+                else:
+                    # Replace the streamed text with the guardrail-checked solution
+                    if solution_placeholder is None:
+                        st.markdown("### 📝 Solution")
+                        solution_placeholder = st.empty()
+                    solution_placeholder.markdown(result["solution"])
+                    if first_token_time is not None:
+                        st.caption(f"First token after {first_token_time:.1f}s")
+                    
+                    # Display metadata
+                    col_a, col_b, col_c, col_d = st.columns(4)
                     
-                    processing_time = time.time() - start_time
-                    st.session_state.question_count += 1
+                    with col_a:
+                        st.metric("Source", result.get("route_decision", "unknown").title())
                     
-                    # Store result for feedback
-                    st.session_state.last_result = result
-                    st.session_state.last_question = question
+                    with col_b:
+                        confidence = result.get("confidence_score", 0)
+                        st.metric("Confidence", f"{confidence:.1%}")
                     
-                    # Check if guardrails passed
-                    if not result.get("guardrail_passed", True):
-                        st.error(f"⚠️ {result.get('error_message', 'Question not appropriate')}")
+                    with col_c:
+                        st.metric("Time", f"{processing_time:.1f}s")
+                    
+                    with col_d:
+                        cost = result.get("cost_estimate", 0)
+                        st.metric("Cost", f"${cost:.4f}")
+                    
+                    # Show warnings if needed
+                    if result.get("needs_human_feedback"):
+                        st.warning("⚠️ This solution may benefit from human review due to low confidence.")
+                    
+                    if confidence >= 0.8:
+                        st.success("✅ High confidence solution!")
+                    elif confidence >= 0.6:
+                        st.info("ℹ️ Moderate confidence solution.")
                     else:
-                        # Display solution
-                        st.markdown("### 📝 Solution")
-                        st.markdown(result["solution"])
-                        
-                        # Display metadata
-                        col_a, col_b, col_c, col_d = st.columns(4)
-                        
-                        with col_a:
-                            st.metric("Source", result.get("route_decision", "unknown").title())
-                        
-                        with col_b:
-                            confidence = result.get("confidence_score", 0)
-                            st.metric("Confidence", f"{confidence:.1%}")
-                        
-                        with col_c:
-                            st.metric("Time", f"{processing_time:.1f}s")
-                        
-                        with col_d:
-                            cost = result.get("cost_estimate", 0)
-                            st.metric("Cost", f"${cost:.4f}")
-                        
-                        # Show warnings if needed
-                        if result.get("needs_human_feedback"):
-                            st.warning("⚠️ This solution may benefit from human review due to low confidence.")
-                        
-                        if confidence >= 0.8:
-                            st.success("✅ High confidence solution!")
-                        elif confidence >= 0.6:
-                            st.info("ℹ️ Moderate confidence solution.")
-                        else:
-                            st.warning("⚠️ Low confidence solution - please verify.")
-                
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    st.info("Please try rephrasing your question or check your internet connection.")
+                        st.warning("⚠️ Low confidence solution - please verify.")
+            
+            except Exception as e:
+                status.empty()
+                st.error(f"❌ Error: {str(e)}")
+                st.info("Please try rephrasing your question or check your internet connection.")
         else:
             st.warning("Please enter a question first!")
 
@@ -199,8 +224,7 @@ with col2:
     if st.button("Clear History"):
         st.session_state.question_count = 0
         st.session_state.feedback_data = []
-        math_agent.total_tokens = 0
-        math_agent.total_cost = 0.0
+        st.session_state.math_agent.usage.reset()
         st.success("History cleared!")
 
 # Feedback section
@@ -3,15 +3,15 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent / "src"))
 
-from src.knowledge_base.setup import math_kb
+from src.knowledge_base.setup import get_math_kb
 
 # Delete existing collection and recreate
 try:
-    math_kb.client.delete_collection("math_knowledge_hybrid")
+    get_math_kb().store.delete_collection()
     print("✅ Deleted existing collection")
 except:
     print("ℹ️ No existing collection to delete")
 
 # Setup again with fixes
-num_problems = math_kb.setup_knowledge_base()
+num_problems = get_math_kb().setup_knowledge_base()
 print(f"✅ Setup complete with {num_problems} problems")
\ No newline at end of file
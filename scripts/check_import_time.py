@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the agent modules
+
+Importing the agent must not load the embedding model, torch, datasets or a
+search client, and must finish within the time budget.
+"""
+
+import subprocess
+import sys
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+MODULES = [
+    "src.agents.math_agent",
+    "src.knowledge_base.setup",
+    "src.tools.search_tools",
+]
+
+FORBIDDEN_MODULES = ["torch", "sentence_transformers", "datasets", "duckduckgo_search", "qdrant_client"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {forbidden!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+def check_module(module: str, budget_seconds: float) -> bool:
+    """Import a module in a fresh interpreter and check time and loaded dependencies"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(f"❌ {module}: import failed\n{result.stderr.strip()}")
+        return False
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    ok = report["seconds"] <= budget_seconds and not report["loaded"]
+    status = "✅" if ok else "❌"
+    print(f"{status} {module}: {report['seconds']:.2f}s (budget {budget_seconds:.2f}s)")
+    if report["loaded"]:
+        print(f"   Eagerly imported: {', '.join(report['loaded'])}")
+    return ok
+
+def main(budget_seconds: float = 3.0):
+    """Check every agent entry module against the import budget"""
+    print("⏱️ Checking import-time budget")
+    results = [check_module(module, budget_seconds) for module in MODULES]
+    return all(results)
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    success = main(budget)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Export the sentence embedder to ONNX (optionally int8) and check parity with torch
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.config.settings import settings
+from src.knowledge_base.curated_problems import ALL_CURATED_PROBLEMS
+from src.knowledge_base.embeddings import OnnxSentenceEmbedder, embedding_parity
+
+# Minimum cosine agreement with the torch model for vectors to share a collection
+PARITY_THRESHOLDS = {"model.onnx": 0.999, "model_quantized.onnx": 0.98}
+
+def export(output_dir: Path):
+    """Export the transformer, tokenizer and an int8 dynamic-quantized copy"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print(f"📦 Exporting {settings.EMBEDDING_MODEL} to {output_dir}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+
+    sample = tokenizer(["Solve x² + 5x + 6 = 0"], return_tensors="pt")
+    dynamic_axes = {"input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "token_type_ids": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"}}
+    torch.onnx.export(
+        LastHiddenState(transformer),
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        str(output_dir / "model.onnx"),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic_axes,
+        opset_version=14
+    )
+    print("✅ Exported model.onnx")
+
+    quantize_dynamic(
+        str(output_dir / "model.onnx"),
+        str(output_dir / "model_quantized.onnx"),
+        weight_type=QuantType.QInt8
+    )
+    print("✅ Exported model_quantized.onnx")
+
+    tokenizer.save_pretrained(str(output_dir))
+    with open(output_dir / "config.json", "w") as f:
+        json.dump({
+            "model": settings.EMBEDDING_MODEL,
+            "dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id
+        }, f, indent=2)
+    return model
+
+def check_parity(reference, output_dir: Path) -> bool:
+    """Compare both ONNX variants against the torch model on knowledge base texts"""
+    texts = [problem["problem"] for problem in ALL_CURATED_PROBLEMS]
+    texts += [f"Problem: {problem['problem']}\nSolution: {problem['solution']}" for problem in ALL_CURATED_PROBLEMS]
+
+    passed = True
+    for model_file, threshold in PARITY_THRESHOLDS.items():
+        candidate = OnnxSentenceEmbedder(str(output_dir), quantized=model_file == "model_quantized.onnx")
+        report = embedding_parity(reference, candidate, texts)
+        ok = report["min_cosine"] >= threshold
+        passed = passed and ok
+        print(f"{'✅' if ok else '❌'} {model_file}: min cosine {report['min_cosine']:.5f} "
+              f"(mean {report['mean_cosine']:.5f}, threshold {threshold}) over {report['texts']} texts")
+    return passed
+
+def main():
+    output_dir = Path(settings.ONNX_MODEL_DIR)
+    reference = export(output_dir)
+    if not check_parity(reference, output_dir):
+        print("\n❌ ONNX embeddings diverge from the torch model; do not mix them in one collection.")
+        return False
+    print(f"\n🎉 Set EMBEDDING_BACKEND=onnx (and optionally ONNX_QUANTIZED=true) to use {output_dir}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
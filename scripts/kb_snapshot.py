@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Export or import a prebuilt knowledge base snapshot artifact
+
+Usage:
+    python scripts/kb_snapshot.py export <path>
+    python scripts/kb_snapshot.py import <path>
+    python scripts/kb_snapshot.py info <path>
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.knowledge_base.snapshot import read_manifest
+
+def main(command: str, path: str):
+    """Run a snapshot command"""
+    try:
+        if command == "info":
+            manifest = read_manifest(path)
+            for key, value in manifest.items():
+                print(f"{key}: {value}")
+            return True
+
+        from src.knowledge_base.setup import get_math_kb
+
+        if command == "export":
+            get_math_kb().export_snapshot(path)
+        elif command == "import":
+            get_math_kb().import_snapshot(path)
+        else:
+            print(f"❌ Unknown command: {command}")
+            return False
+    except Exception as e:
+        print(f"❌ Snapshot {command} failed: {e}")
+        return False
+
+    return True
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    success = main(sys.argv[1], sys.argv[2])
+    sys.exit(0 if success else 1)
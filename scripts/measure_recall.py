@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Measure recall loss of quantized or approximate search against exact search
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.config.settings import settings
+from src.knowledge_base.setup import get_math_kb
+
+def main(num_queries: int = 200, limit: int = 10):
+    """Sample stored problems as queries and compare top-k against exact search"""
+    kb = get_math_kb()
+    point_ids = [entry["id"] for entry in kb.exact_index.entries.values()]
+    if not point_ids:
+        print("❌ No indexed problems found. Run scripts/setup_system.py first.")
+        return False
+
+    random.seed(0)
+    sample = random.sample(point_ids, min(num_queries, len(point_ids)))
+    queries = [record["payload"]["problem"] for record in kb.store.retrieve(sample, with_payload=["problem"])]
+
+    print(f"🔍 Backend: {settings.VECTOR_BACKEND}, quantization: {settings.VECTOR_QUANTIZATION}, "
+          f"oversampling: {settings.QUANTIZATION_OVERSAMPLING}")
+    report = kb.measure_recall(queries, limit=limit)
+
+    print(f"📊 Recall@{report['limit']}: {report['recall']:.3f} over {report['queries']} queries")
+    print(f"⏱️ Configured search: {report['approximate_ms_per_query']:.2f} ms/query")
+    print(f"⏱️ Exact search: {report['exact_ms_per_query']:.2f} ms/query")
+    return True
+
+if __name__ == "__main__":
+    num_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    success = main(num_queries, limit)
+    sys.exit(0 if success else 1)
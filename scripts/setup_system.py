@@ -12,7 +12,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from src.config.settings import settings
-from src.knowledge_base.setup import math_kb
+from src.knowledge_base.setup import get_math_kb
 
 def check_requirements():
     """Check if all requirements are met"""
@@ -27,11 +27,15 @@ def check_requirements():
         print("Please set your OPENAI_API_KEY in the .env file")
         return False
     
+    # The embedded local index needs no server
+    if settings.VECTOR_BACKEND == "local":
+        print(f"✅ Using local vector index in {settings.LOCAL_INDEX_DIR}")
+        return True
+    
     # Check if Qdrant is running
     try:
-        from qdrant_client import QdrantClient
-        client = QdrantClient(settings.QDRANT_URL)
-        client.get_collections()
+        from src.knowledge_base.qdrant_store import get_qdrant_client
+        get_qdrant_client().get_collections()
         print("✅ Qdrant database connection successful")
     except Exception as e:
         print(f"❌ Qdrant connection failed: {e}")
@@ -45,7 +49,10 @@ def setup_knowledge_base():
     print("\n📚 Setting up knowledge base...")
     
     try:
-        num_problems = math_kb.setup_knowledge_base()
+        if settings.KB_SNAPSHOT_PATH and Path(settings.KB_SNAPSHOT_PATH).exists():
+            num_problems = get_math_kb().import_snapshot(settings.KB_SNAPSHOT_PATH)
+        else:
+            num_problems = get_math_kb().setup_knowledge_base()
         print(f"✅ Knowledge base ready with {num_problems} problems")
         return True
     except Exception as e:
@@ -57,10 +64,11 @@ def test_system():
     print("\n🧪 Testing system components...")
     
     # Import workflow creation function
-    from src.agents.math_agent import get_workflow
+    from src.agents.math_agent import get_workflow, warmup
     
     try:
         workflow, math_agent = get_workflow()
+        warmup()
         print("✅ Workflow created successfully")
     except Exception as e:
         print(f"❌ Failed to create workflow: {e}")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Incrementally sync the knowledge base with the current corpus
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.knowledge_base.setup import get_math_kb
+
+def main():
+    """Upsert new or changed problems and delete stale ones"""
+    try:
+        stats = get_math_kb().sync_knowledge_base()
+    except Exception as e:
+        print(f"❌ Knowledge base sync failed: {e}")
+        return False
+
+    print(f"📊 Upserted {stats['upserted']}, deleted {stats['deleted']}, "
+          f"unchanged {stats['unchanged']} (total {stats['total']})")
+    if stats["failed_sources"]:
+        print(f"❌ Failed to load {', '.join(stats['failed_sources'])}; "
+              f"kept their {stats['kept']} existing problems instead of deleting them")
+        return False
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -90,6 +90,7 @@ def test_math_agent():
             results.append({
                 "test": test_case["category"],
                 "route_correct": route_match,
+                "route_source": result.get("route_source", ""),
                 "confidence": confidence,
                 "processing_time": processing_time,
                 "tokens": result.get("tokens_used", 0),
@@ -97,7 +98,7 @@ def test_math_agent():
             })
             
             # Display results
-            print(f"✅ Route: {result['route_decision']} {'✓' if route_match else '✗'}")
+            print(f"✅ Route: {result['route_decision']} {'✓' if route_match else '✗'} ({result.get('route_source', 'llm')} router)")
             print(f"✅ Confidence: {confidence:.2f}")
             print(f"✅ Processing time: {processing_time:.2f}s")
             print(f"✅ Solution preview: {result['solution'][:150]}...")
@@ -110,6 +111,7 @@ def test_math_agent():
             results.append({
                 "test": test_case["category"],
                 "route_correct": False,
+                "route_source": "",
                 "confidence": 0,
                 "processing_time": 0,
                 "tokens": 0,
@@ -129,10 +131,34 @@ def test_math_agent():
     
     print(f"Total tests: {total_tests}")
     print(f"Correct routing: {successful_routes}/{total_tests} ({successful_routes/total_tests*100:.1f}%)")
+    
+    if math_agent.local_router is not None:
+        local_routes = sum(1 for r in results if r["route_source"] == "local")
+        report = math_agent.local_router.evaluate([
+            {"question": test_case["question"], "route": test_case["expected_route"]}
+            for test_case in test_cases
+        ])
+        print(f"Local router accuracy: {report['accuracy']*100:.1f}% "
+              f"({report['confident_accuracy']*100:.1f}% on the {report['coverage']*100:.1f}% it routes confidently)")
+        print(f"Routed locally without the LLM: {local_routes}/{total_tests}")
     print(f"Average confidence: {avg_confidence:.2f}")
     print(f"Total processing time: {total_time:.2f}s")
     print(f"Total tokens used: {total_tokens}")
     print(f"Total cost: ${final_cost:.4f}")
+    for node, usage in math_agent.usage.by_node.items():
+        print(f"  {node}: {usage['calls']} calls, {usage['input_tokens']} in / {usage['output_tokens']} out tokens, "
+              f"${usage['cost']:.4f}")
+    
+    if math_agent.llm_cache is not None:
+        cache = math_agent.llm_cache.stats()
+        print(f"LLM response cache: {cache['hits']}/{cache['hits'] + cache['misses']} hits "
+              f"({cache['hit_rate']*100:.1f}%), {cache['size']} entries, "
+              f"{cache['all_time_hit_rate']*100:.1f}% hit rate across all runs")
+    
+    speculation = math_agent.speculation_stats()
+    if speculation["speculations"]:
+        print(f"Speculative KB searches wasted: {speculation['wasted']}/{speculation['speculations']} "
+              f"({speculation['wasted_rate']*100:.1f}%)")
     
     return results
 
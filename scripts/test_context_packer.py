@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Check that context packing keeps reasoning and final answers of real corpus solutions
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.agents.context_packer import ContextPacker
+from src.knowledge_base.setup import MathKnowledgeBase
+
+# First GSM8K train record, formatted the way ingestion stores it
+GSM8K_QUESTION = ("Natalia sold clips to 48 of her friends in April, and then she sold half as many clips in May. "
+                  "How many clips did Natalia sell altogether in April and May?")
+GSM8K_ANSWER = ("Natalia sold 48/2 = <<48/2=24>>24 clips in May.\n"
+                "Natalia sold 48+24 = <<48+24=72>>72 clips altogether in April and May.\n"
+                "#### 72")
+
+# MATH solutions are stored as published: LaTeX prose ending in \boxed{...}
+MATH_QUESTION = "If $x^2+y^2=1$, what is the largest possible value of $|x|+|y|$?"
+MATH_SOLUTION = (
+    "If $(x,y)$ lies on the circle, so does $(x,-y),$ $(-x,-y),$ and $(-x,-y),$ (which all give the same "
+    "value of $|x| + |y|$), so we can assume that $x \\ge 0$ and $y \\ge 0.$\n"
+    "Then $|x| + |y| = x + y.$  Squaring, we get\n"
+    "\\[(x + y)^2 = x^2 + 2xy + y^2 = 1 + 2xy.\\]"
+    "Note that $(x - y)^2 \\ge 0.$  Expanding, we get $x^2 - 2xy + y^2 \\ge 0,$ so $2xy \\le x^2 + y^2 = 1.$  "
+    "Hence,\n"
+    "\\[1 + 2xy \\le 2,\\]which means $x + y \\le \\sqrt{2}.$  Equality occurs when $x = y = \\frac{1}{\\sqrt{2}},$ "
+    "so the maximum value of $|x| + |y|$ is $\\boxed{\\sqrt{2}}.$"
+)
+
+def hit(problem: str, solution: str) -> dict:
+    return {"problem": problem, "solution": solution, "topic": "algebra", "difficulty": "basic", "score": 0.9}
+
+def check(name: str, context: str, expected: list) -> bool:
+    missing = [text for text in expected if text not in context]
+    passed = not missing
+    print(f"{'✅' if passed else '❌'} {name}" + (f": missing {missing}" if missing else ""))
+    return passed
+
+def check_gsm8k(packer: ContextPacker) -> bool:
+    """Every reasoning line after "Step 1:" and the "####" answer survive packing"""
+    kb = MathKnowledgeBase.__new__(MathKnowledgeBase)  # format_gsm8k_solution needs no model
+    solution = kb.format_gsm8k_solution(GSM8K_ANSWER)
+    context = packer.pack(GSM8K_QUESTION, [hit(GSM8K_QUESTION, solution)])
+    return check("GSM8K solution keeps its reasoning and answer", context,
+                 ["Natalia sold 48/2", "72 clips altogether", "#### 72"])
+
+def check_math(packer: ContextPacker) -> bool:
+    """Unstructured MATH prose keeps relevant sentences and the boxed answer"""
+    context = packer.pack(MATH_QUESTION, [hit(MATH_QUESTION, MATH_SOLUTION)])
+    # "..." marks sentences left out to stay within max_steps
+    return check("MATH solution keeps relevant sentences and the boxed answer", context,
+                 ["so $2xy \\le x^2 + y^2 = 1.$", "\n...\n", "$\\boxed{\\sqrt{2}}.$"])
+
+def check_answer_only_fallback() -> bool:
+    """When the steps do not fit, the problem and its final answer still do"""
+    kb = MathKnowledgeBase.__new__(MathKnowledgeBase)
+    packer = ContextPacker(budget=120, model="gpt-4o-mini")
+    solution = kb.format_gsm8k_solution(GSM8K_ANSWER)
+    context = packer.pack(GSM8K_QUESTION, [hit(GSM8K_QUESTION, solution * 3)])
+    return check("Tight budget keeps the final answer", context, ["#### 72"])
+
+def main():
+    """Run the context packing checks"""
+    print("🧪 Testing context packing on corpus solutions")
+    packer = ContextPacker(budget=500, max_steps=3, model="gpt-4o-mini")
+    results = [check_gsm8k(packer), check_math(packer), check_answer_only_fallback()]
+    return all(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
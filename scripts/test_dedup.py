@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check MinHash near-duplicate detection against exact Jaccard similarity
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.knowledge_base.dedup import NearDuplicateDetector
+
+TEMPLATE = "Let f be a real function such that f is {}. Prove that f is {}."
+
+def check_estimates(detector: NearDuplicateDetector) -> bool:
+    """Estimated similarity should track true Jaccard across the whole range"""
+    random.seed(0)
+    words = ["prime", "integer", "function", "triangle", "circle", "sum", "product", "root",
+             "polynomial", "sequence", "limit", "derivative", "matrix", "vector", "angle"]
+    max_error = 0.0
+    for _ in range(200):
+        base = random.choices(words, k=12)
+        edited = [random.choice(words) if random.random() < random.random() else word for word in base]
+        text_a, text_b = " ".join(base), " ".join(edited)
+        error = abs(detector.similarity(text_a, text_b) - detector.jaccard(text_a, text_b))
+        max_error = max(max_error, error)
+
+    # Standard error of the estimate is at most 0.5 / sqrt(num_perm)
+    tolerance = 5 * 0.5 / detector.num_perm ** 0.5
+    passed = max_error <= tolerance
+    print(f"{'✅' if passed else '❌'} Max estimation error {max_error:.3f} (tolerance {tolerance:.3f})")
+    return passed
+
+def check_distinct_problems_kept(detector: NearDuplicateDetector) -> bool:
+    """Templated problems differing in a hypothesis or conclusion are all distinct"""
+    properties = ["continuous", "bounded", "monotonic", "periodic", "convex", "injective",
+                  "surjective", "differentiable", "integrable", "odd", "even", "linear"]
+    problems = {f"{a}-{b}": TEMPLATE.format(a, b) for a in properties for b in properties if a != b}
+    dropped = [key for key, problem in problems.items() if detector.add(key, problem) is not None]
+
+    passed = not dropped
+    print(f"{'✅' if passed else '❌'} {len(dropped)}/{len(problems)} distinct templated problems dropped"
+          + (f", e.g. {dropped[:3]}" if dropped else ""))
+    return passed
+
+def check_pair_kept(name: str, text_a: str, text_b: str) -> bool:
+    """A single pair of distinct problems must both be kept"""
+    detector = NearDuplicateDetector()
+    detector.add("a", text_a)
+    passed = detector.add("b", text_b) is None
+    print(f"{'✅' if passed else '❌'} {name} kept (Jaccard {detector.jaccard(text_a, text_b):.2f})")
+    return passed
+
+def check_duplicates_dropped(detector: NearDuplicateDetector) -> bool:
+    """Whitespace and punctuation variants of the same problem are still caught"""
+    original = "Find all real numbers x such that x^2 - 5x + 6 = 0 and x is greater than 2."
+    variant = "Find all real numbers x such that  x^2 - 5x + 6 = 0, and x is greater than 2"
+    detector.add("original", original)
+    passed = detector.add("variant", variant) == "original"
+    print(f"{'✅' if passed else '❌'} Near-identical variant detected as duplicate")
+    return passed
+
+def main():
+    """Run the dedup checks"""
+    print("🧪 Testing near-duplicate detection")
+    results = [
+        check_estimates(NearDuplicateDetector()),
+        check_distinct_problems_kept(NearDuplicateDetector()),
+        check_pair_kept("Converse", TEMPLATE.format("integrable", "differentiable"),
+                        TEMPLATE.format("differentiable", "integrable")),
+        check_pair_kept("Different conclusion", TEMPLATE.format("convex", "continuous"),
+                        TEMPLATE.format("convex", "bounded")),
+        check_pair_kept("Converse in prose", "If f is integrable, prove that f is differentiable.",
+                        "If f is differentiable, prove that f is integrable."),
+        check_duplicates_dropped(NearDuplicateDetector())
+    ]
+    return all(results)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
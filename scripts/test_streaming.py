@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Check that solution tokens stream from both the sync and async workflows
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+# Only the LLM nodes matter here; skip the lookups that need a built knowledge base
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+for name in ("EXACT_MATCH_ENABLED", "ANSWER_CACHE_ENABLED", "LOCAL_ROUTER_ENABLED",
+             "LLM_CACHE_ENABLED", "SPECULATIVE_KB_SEARCH", "TRACING_ENABLED"):
+    os.environ[name] = "false"
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+import src.agents.math_agent as math_agent
+
+SOLUTION = "Step 1: Subtract 2 from both sides, x = 4 - 2\nStep 2: Simplify\n**Final Answer:** x = 2"
+
+class StubKnowledgeBase:
+    def search(self, query, limit=5, **kwargs):
+        return []
+
+    async def asearch(self, query, limit=5, **kwargs):
+        return []
+
+def initial_state() -> dict:
+    return {
+        "question": "Solve x + 2 = 4",
+        "route_decision": "",
+        "knowledge_base_results": "",
+        "web_search_results": "",
+        "context": "",
+        "solution": "",
+        "confidence_score": 0.0,
+        "needs_human_feedback": False,
+        "guardrail_passed": True,
+        "error_message": None,
+        "processing_time": 0.0,
+        "tokens_used": 0,
+        "cost_estimate": 0.0
+    }
+
+def make_agent():
+    agent = math_agent.get_math_agent()
+    agent.llm_router = FakeListChatModel(responses=["knowledge_base"] * 2)
+    agent.llm_generator = FakeListChatModel(responses=[SOLUTION] * 2)
+    return agent
+
+def count_tokens(stream) -> tuple:
+    tokens, result = [], None
+    for kind, payload in stream:
+        if kind == "token":
+            tokens.append(payload)
+        else:
+            result = payload
+    return tokens, result
+
+async def acount_tokens(stream) -> tuple:
+    tokens, result = [], None
+    async for kind, payload in stream:
+        if kind == "token":
+            tokens.append(payload)
+        else:
+            result = payload
+    return tokens, result
+
+def check(name: str, tokens: list, result: dict) -> bool:
+    passed = len(tokens) > 1 and "".join(tokens) == SOLUTION and result["solution"]
+    print(f"{'✅' if passed else '❌'} {name} streamed {len(tokens)} tokens")
+    return passed
+
+def main():
+    """Stream one question through each workflow"""
+    print(f"🧪 Testing solution streaming on Python {sys.version.split()[0]}")
+    math_agent.get_math_kb = lambda: StubKnowledgeBase()
+
+    agent = make_agent()
+    tokens, result = count_tokens(math_agent.stream_solution(agent.create_workflow(), initial_state()))
+    sync_passed = check("stream_solution", tokens, result)
+
+    agent = make_agent()
+    workflow = agent.create_workflow(use_async=True)
+    tokens, result = asyncio.run(acount_tokens(math_agent.astream_solution(workflow, initial_state())))
+    async_passed = check("astream_solution", tokens, result)
+    return sync_passed and async_passed
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,188 @@
+import base64
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from src.config.settings import settings
+from src.knowledge_base.exact_match import extract_numbers
+
+class SemanticAnswerCache:
+    """Local vector index of previously answered questions.
+
+    A lookup hits when the cosine similarity to a cached question clears the
+    threshold and both questions mention the same numbers, so paraphrases are
+    served while "x² + 5x + 6" never answers "x² + 5x + 7". Entries expire after
+    a TTL and the least recently used ones are evicted beyond max_entries.
+
+    Entries are persisted by appending one line per answer to entries.jsonl, and
+    every lookup first reads lines appended since the last one, so processes
+    sharing the directory see each other's answers. The log is compacted to the
+    live entries once it holds twice max_entries lines.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, threshold: Optional[float] = None,
+                 ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.dir = Path(cache_dir or settings.ANSWER_CACHE_DIR)
+        self.log_path = self.dir / "entries.jsonl"
+        self.threshold = settings.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl_seconds = settings.ANSWER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.ANSWER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+
+        self.entries: List[Dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+        self._offset = 0
+        self._inode = None
+        self._log_lines = 0
+        with self._lock:
+            self._sync()
+
+    def _encode_line(self, entry: Dict, vector: np.ndarray) -> str:
+        vector_b64 = base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+        return json.dumps({**entry, "vector": vector_b64}, ensure_ascii=False) + "\n"
+
+    def _sync(self):
+        """Read entries appended to the log since the last sync, reloading if it was compacted"""
+        try:
+            stat = self.log_path.stat()
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self.entries, self.vectors = [], None
+            self._offset, self._inode, self._log_lines = 0, stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # a line still being written is read next time
+        self._offset += len(complete)
+
+        rows = []
+        for line in complete.splitlines():
+            self._log_lines += 1
+            try:
+                entry = json.loads(line)
+                vector = np.frombuffer(base64.b64decode(entry.pop("vector")), dtype=np.float32)
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable answer cache entry: {e}")
+                continue
+            if self.vectors is not None and vector.shape[0] != self.vectors.shape[1]:
+                continue
+            self.entries.append(entry)
+            rows.append(vector)
+        if rows:
+            stacked = np.stack(rows)
+            self.vectors = stacked if self.vectors is None else np.vstack([self.vectors, stacked])
+
+    def _append(self, entry: Dict, vector: np.ndarray):
+        """Append one entry to the log in a single write"""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, self._encode_line(entry, vector).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _compact(self):
+        """Atomically rewrite the log with only the live entries"""
+        tmp_path = self.dir / f"entries.{os.getpid()}.tmp.jsonl"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry, vector in zip(self.entries, self.vectors if self.vectors is not None else []):
+                f.write(self._encode_line(entry, vector))
+        os.replace(tmp_path, self.log_path)
+        stat = self.log_path.stat()
+        self._offset, self._inode, self._log_lines = stat.st_size, stat.st_ino, len(self.entries)
+
+    def _normalize(self, vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        return array / max(float(np.linalg.norm(array)), 1e-12)
+
+    def _keep(self, rows: List[int]):
+        self.entries = [self.entries[row] for row in rows]
+        self.vectors = self.vectors[rows] if rows else None
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used beyond the size cap"""
+        if not self.entries:
+            return
+        rows = [
+            row for row, entry in enumerate(self.entries)
+            if now - entry["created_at"] <= self.ttl_seconds
+        ]
+        if len(rows) > self.max_entries:
+            rows = sorted(rows, key=lambda row: self.entries[row]["last_used"])[-self.max_entries:]
+            rows.sort()
+        if len(rows) != len(self.entries):
+            self._keep(rows)
+
+    def lookup(self, question: str, vector: List[float]) -> Optional[Dict]:
+        """Return the cached answer for a sufficiently similar question"""
+        with self._lock:
+            now = time.time()
+            self._sync()
+            self._evict(now)
+            if self.vectors is None:
+                self.misses += 1
+                return None
+
+            similarities = self.vectors @ self._normalize(vector)
+            numbers = extract_numbers(question)
+            for row in np.argsort(-similarities):
+                if similarities[row] < self.threshold:
+                    break
+                entry = self.entries[row]
+                if entry["numbers"] == numbers and entry["confidence_score"] >= settings.ANSWER_CACHE_MIN_CONFIDENCE:
+                    entry["last_used"] = now
+                    self.hits += 1
+                    return {**entry, "similarity": float(similarities[row])}
+
+            self.misses += 1
+            return None
+
+    def add(self, question: str, vector: List[float], solution: str, confidence_score: float, route_decision: str):
+        """Store a solved question, evicting old entries as needed"""
+        with self._lock:
+            now = time.time()
+            entry = {
+                "question": question,
+                "numbers": extract_numbers(question),
+                "solution": solution,
+                "confidence_score": confidence_score,
+                "route_decision": route_decision,
+                "created_at": now,
+                "last_used": now
+            }
+            self._append(entry, self._normalize(vector))
+            self._sync()
+            self._evict(now)
+            if self._log_lines > 2 * self.max_entries:
+                self._compact()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Return the process-wide answer cache shared by every agent and session"""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache()
+    return _answer_cache
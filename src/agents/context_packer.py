@@ -0,0 +1,141 @@
+import re
+from typing import Dict, List, Optional, Set
+from src.config.settings import settings
+from src.agents.usage import count_tokens
+
+KB_HEADER = "=== SIMILAR PROBLEMS FROM KNOWLEDGE BASE ==="
+WEB_HEADER = "=== CURRENT INFORMATION FROM WEB ==="
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "find", "for", "from", "how", "i",
+    "if", "in", "is", "it", "of", "on", "or", "solve", "the", "this", "to", "what", "when", "with"
+}
+
+STEP_PATTERN = re.compile(r"^\s*step\s*\d+\s*[:.)]", re.IGNORECASE)
+# Curated "Final Answer:", GSM8K "#### N" and MATH "\boxed{...}"
+FINAL_ANSWER_PATTERN = re.compile(r"final answer|^\s*####|\\boxed\s*\{", re.IGNORECASE)
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|(?<=[.!?]\$)\s+")  # MATH often ends sentences inside $...$
+
+def terms(text: str) -> Set[str]:
+    """Lowercase words, numbers and single math symbols, without stopwords"""
+    return {term for term in re.findall(r"[a-z]+|\d+(?:\.\d+)?|[=+\-*/^²³√∫]", text.lower())
+            if term not in STOPWORDS}
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+class ContextPacker:
+    """Packs retrieved material into a token budget for the generator prompt.
+
+    Knowledge base hits are ranked by retrieval score, and near-identical
+    problems are dropped. Each kept hit is reduced to the solution steps that
+    share the most terms with the question, plus its final answer. A "Step N"
+    line carries the lines after it, and solutions without step headers are
+    split into sentences. Blocks are added best first while they fit
+    CONTEXT_TOKEN_BUDGET. A block that does not fit falls back to its problem
+    and final answer alone, and otherwise it is skipped. Web results fill
+    whatever budget remains.
+    """
+
+    def __init__(self, budget: Optional[int] = None, max_steps: Optional[int] = None,
+                 dedup_threshold: Optional[float] = None, model: Optional[str] = None):
+        self.budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        self.max_steps = settings.CONTEXT_MAX_STEPS if max_steps is None else max_steps
+        self.dedup_threshold = settings.CONTEXT_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+        self.model = model or settings.GENERATOR_MODEL
+
+    def tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def rank_hits(self, hits: List[Dict]) -> List[Dict]:
+        """Hits by descending score, skipping problems nearly identical to a better one"""
+        kept, kept_terms = [], []
+        for hit in sorted(hits, key=lambda hit: hit.get("score", 0.0), reverse=True):
+            problem_terms = terms(hit["problem"])
+            if any(jaccard(problem_terms, other) >= self.dedup_threshold for other in kept_terms):
+                continue
+            kept.append(hit)
+            kept_terms.append(problem_terms)
+        return kept
+
+    def split_steps(self, solution: str) -> List[str]:
+        """Solution units: each "Step N" header with its continuation lines, or else each sentence"""
+        lines = [line.strip() for line in solution.splitlines() if line.strip()]
+        if not any(STEP_PATTERN.match(line) for line in lines):
+            return [sentence for line in lines for sentence in SENTENCE_BREAK.split(line) if sentence]
+        
+        steps = []
+        for line in lines:
+            if STEP_PATTERN.match(line) or not steps or FINAL_ANSWER_PATTERN.search(line):
+                steps.append(line)
+            else:
+                steps[-1] += "\n" + line
+        return steps
+    
+    def select_steps(self, question_terms: Set[str], solution: str) -> List[str]:
+        """The max_steps steps with the most question terms, in solution order, plus the final answer"""
+        units = self.split_steps(solution)
+        final = [unit for unit in units if FINAL_ANSWER_PATTERN.search(unit)]
+        steps = [unit for unit in units if unit not in final]
+
+        ranked = sorted(range(len(steps)), key=lambda i: (-len(terms(steps[i]) & question_terms), i))
+        chosen = sorted(ranked[:self.max_steps])
+        selected = []
+        for position, index in enumerate(chosen):
+            if index > (chosen[position - 1] + 1 if position else 0):
+                selected.append("...")
+            selected.append(steps[index])
+        if chosen and chosen[-1] < len(steps) - 1:
+            selected.append("...")
+        return selected + final[-1:]
+
+    def kb_block(self, number: int, hit: Dict, steps: List[str]) -> str:
+        lines = [f"Example {number} ({hit['topic']}, {hit['difficulty']}, relevance {hit['score']:.2f}):",
+                 f"Problem: {hit['problem']}"]
+        if steps:
+            lines.append("Solution:")
+            lines.extend(steps)
+        return "\n".join(lines)
+
+    def web_blocks(self, web_results: str) -> List[str]:
+        """Title and content of each formatted web result"""
+        blocks = []
+        for chunk in web_results.split("---"):
+            fields = dict(re.findall(r"^(Title|Content): (.*)$", chunk, re.MULTILINE))
+            if fields.get("Content"):
+                blocks.append(f"{fields.get('Title', 'N/A')}: {fields['Content']}")
+        return blocks
+
+    def pack(self, question: str, kb_hits: Optional[List[Dict]] = None, web_results: str = "") -> str:
+        """Context string within the token budget; empty when nothing fits or nothing was found"""
+        question_terms = terms(question)
+        remaining = self.budget
+        sections = []
+
+        kb_blocks = []
+        for hit in self.rank_hits(kb_hits or []):
+            solution = hit.get("solution") or hit.get("solution_snippet", "")
+            steps = self.select_steps(question_terms, solution)
+            number = len(kb_blocks) + 1
+            final = [step for step in steps[-1:] if FINAL_ANSWER_PATTERN.search(step)]
+            candidates = [self.kb_block(number, hit, steps), self.kb_block(number, hit, final)]
+            header_cost = 0 if kb_blocks else self.tokens(KB_HEADER)
+            for block in candidates:
+                cost = self.tokens(block) + header_cost
+                if cost <= remaining:
+                    kb_blocks.append(block)
+                    remaining -= cost
+                    break
+        if kb_blocks:
+            sections.append("\n\n".join([KB_HEADER] + kb_blocks))
+
+        web_kept = []
+        for block in self.web_blocks(web_results or ""):
+            cost = self.tokens(block) + (0 if web_kept else self.tokens(WEB_HEADER))
+            if cost <= remaining:
+                web_kept.append(block)
+                remaining -= cost
+        if web_kept:
+            sections.append("\n".join([WEB_HEADER] + web_kept))
+
+        return "\n\n".join(sections)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from src.config.settings import settings
+
+class LLMResponseCache:
+    """SQLite-backed cache of LLM completions shared across processes and restarts.
+
+    Entries are keyed on the model, its sampling parameters and a hash of the
+    prompt. They expire after a TTL, and beyond max_entries the least recently
+    used are evicted. Hit and miss counts are kept both for this process and,
+    in the database, across all processes using the same file.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.path = Path(path or settings.LLM_CACHE_PATH)
+        self.ttl_seconds = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    def key(self, model: str, params: Dict, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps({"model": model, "params": params, "prompt": prompt_hash}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        self.conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion text, or None on a miss or an expired entry"""
+        with self._lock:
+            now = time.time()
+            row = self.conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                self._count("misses")
+                return None
+
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._count("hits")
+            return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        """Store a completion and evict the least recently used entries beyond the cap"""
+        with self._lock:
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("UPDATE counters SET value = 0")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            counters = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = self.hits + self.misses
+        all_lookups = counters["hits"] + counters["misses"]
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "all_time_hits": counters["hits"],
+            "all_time_misses": counters["misses"],
+            "all_time_hit_rate": counters["hits"] / all_lookups if all_lookups else 0.0
+        }
@@ -0,0 +1,78 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.config.settings import settings
+from src.agents.routing_examples import ROUTING_EXAMPLES
+from src.knowledge_base.setup import get_math_kb
+
+class LocalRouter:
+    """Nearest-centroid route classifier over the retrieval query embedding.
+
+    Each route is represented by the normalized mean embedding of its labeled
+    examples. A question's similarities to the centroids are turned into
+    probabilities with a temperature-scaled softmax. predict() returns the best
+    route together with that probability, so callers can fall back to the LLM
+    router when it is below the threshold. The embedding goes through the
+    knowledge base's query cache, so the retrieval that follows reuses it.
+    """
+
+    def __init__(self, examples: Optional[List[Dict]] = None, threshold: Optional[float] = None,
+                 temperature: Optional[float] = None):
+        self.examples = examples or ROUTING_EXAMPLES
+        self.threshold = settings.LOCAL_ROUTER_THRESHOLD if threshold is None else threshold
+        self.temperature = temperature or settings.LOCAL_ROUTER_TEMPERATURE
+        self.routes: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+    def fit(self):
+        """Embed the labeled examples and compute one centroid per route"""
+        vectors = self._normalize(np.asarray(
+            get_math_kb().embed_queries([example["question"] for example in self.examples]),
+            dtype=np.float32
+        ))
+        labels = np.array([example["route"] for example in self.examples])
+        self.routes = sorted({example["route"] for example in self.examples})
+        self.centroids = self._normalize(np.stack([vectors[labels == route].mean(axis=0) for route in self.routes]))
+
+    def ensure_fitted(self):
+        if self.centroids is None:
+            with self._lock:
+                if self.centroids is None:
+                    self.fit()
+
+    def predict(self, question: str) -> Tuple[str, float]:
+        """Most likely route and its probability"""
+        self.ensure_fitted()
+        vector = self._normalize(np.asarray(get_math_kb().embed_query(question), dtype=np.float32))
+        logits = (self.centroids @ vector) / self.temperature
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        best = int(np.argmax(probabilities))
+        return self.routes[best], float(probabilities[best])
+
+    def route(self, question: str) -> Optional[str]:
+        """Confident local route, or None to defer to the LLM router"""
+        route, confidence = self.predict(question)
+        return route if confidence >= self.threshold else None
+
+    def evaluate(self, examples: List[Dict]) -> Dict[str, float]:
+        """Accuracy of predictions overall and on the confident subset that skips the LLM"""
+        correct = confident = confident_correct = 0
+        for example in examples:
+            route, confidence = self.predict(example["question"])
+            is_correct = route == example["route"]
+            correct += is_correct
+            if confidence >= self.threshold:
+                confident += 1
+                confident_correct += is_correct
+        total = len(examples)
+        return {
+            "examples": total,
+            "accuracy": correct / total if total else 0.0,
+            "coverage": confident / total if total else 0.0,
+            "confident_accuracy": confident_correct / confident if confident else 0.0
+        }
@@ -1,12 +1,34 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import threading
 import time
 import re
+import uuid
 from src.config.settings import settings
 from src.agents.state import MathAgentState
-from src.tools.search_tools import web_search_tool
-from src.knowledge_base.setup import math_kb
+from src.tools.search_tools import get_web_search_tool
+from src.knowledge_base.setup import get_math_kb
+from src.agents.answer_cache import get_answer_cache
+from src.agents.local_router import LocalRouter
+from src.agents.usage import UsageTracker, response_usage, summarize
+from src.agents.tracing import Tracer
+from src.agents.llm_cache import LLMResponseCache
+from src.agents.context_packer import ContextPacker
+
+# Routes whose context includes knowledge base results
+KB_ROUTES = ("knowledge_base", "both")
+
+# Shared by every agent in the process, so Streamlit sessions don't each start
+# their own threads. Blocking searches run here so the sync nodes can give up on
+# them after a timeout. Speculative KB searches get a separate pool because they
+# wait on the search pool themselves.
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=settings.SEARCH_EXECUTOR_WORKERS, thread_name_prefix="search")
+SPECULATION_EXECUTOR = ThreadPoolExecutor(max_workers=settings.SEARCH_EXECUTOR_WORKERS, thread_name_prefix="speculate")
 
 class CostOptimizedMathAgent:
     def __init__(self):
@@ -14,30 +36,97 @@ class CostOptimizedMathAgent:
         self.llm_router = ChatOpenAI(
             model=settings.ROUTER_MODEL,
             temperature=0,
-            api_key=settings.OPENAI_API_KEY
+            api_key=settings.OPENAI_API_KEY,
+            stream_usage=True
         )
         
         self.llm_generator = ChatOpenAI(
             model=settings.GENERATOR_MODEL,
             temperature=0.1,
-            api_key=settings.OPENAI_API_KEY
+            api_key=settings.OPENAI_API_KEY,
+            stream_usage=True
         )
         
         # Usage tracking
-        self.total_tokens = 0
-        self.total_cost = 0.0
-    
-    def track_usage(self, tokens: int, model: str):
-        """Track API usage and costs"""
-        self.total_tokens += tokens
+        self.usage = UsageTracker()
         
-        # Rough cost estimates (as of 2024)
-        cost_per_token = {
-            "gpt-3.5-turbo": 0.0000015,  # $1.50 per 1M tokens
-            "gpt-4o-mini": 0.00000015,   # $0.15 per 1M tokens
-        }
+        # Previously solved questions, matched by meaning
+        self.answer_cache = get_answer_cache() if settings.ANSWER_CACHE_ENABLED else None
+        
+        # Embedding classifier that answers most routing decisions without the LLM
+        self.local_router = LocalRouter() if settings.LOCAL_ROUTER_ENABLED else None
+        
+        # Ranks, dedups and trims retrieved context to a token budget
+        self.context_packer = ContextPacker()
+        
+        # Completions of identical router/generator prompts, shared across processes
+        self.llm_cache = LLMResponseCache() if settings.LLM_CACHE_ENABLED else None
+        
+        # Per-node spans exported once per request
+        self.tracer = Tracer() if settings.TRACING_ENABLED else None
         
-        self.total_cost += tokens * cost_per_token.get(model, 0.000001)
+        # Speculative KB searches started alongside the router, and how many were thrown away
+        self.speculative_searches: Dict[str, Any] = {}
+        self.speculations = 0
+        self.wasted_speculations = 0
+        self._speculation_lock = threading.Lock()
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.usage.total_tokens
+    
+    @property
+    def total_cost(self) -> float:
+        return self.usage.total_cost
+    
+    def track_usage(self, node: str, model: str, prompt: str, response) -> Dict:
+        """Track API usage and costs of one LLM call"""
+        usage = response_usage(node, model, prompt, response)
+        self.usage.record(usage)
+        return usage
+    
+    def llm_cache_key(self, llm: ChatOpenAI, prompt: str) -> str:
+        return self.llm_cache.key(llm.model_name, {"temperature": llm.temperature}, prompt)
+    
+    def cached_response(self, content: str) -> AIMessage:
+        """A cache hit, marked so usage accounting records it as free"""
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+            response_metadata={"llm_cache_hit": True}
+        )
+    
+    def call_llm(self, llm: ChatOpenAI, prompt: str):
+        """invoke() through the persistent LLM response cache"""
+        if self.llm_cache is None:
+            return llm.invoke(prompt)
+        
+        key = self.llm_cache_key(llm, prompt)
+        content = self.llm_cache.get(key)
+        if content is not None:
+            return self.cached_response(content)
+        
+        response = llm.invoke(prompt)
+        self.llm_cache.put(key, llm.model_name, response.content)
+        return response
+    
+    async def acall_llm(self, llm: ChatOpenAI, prompt: str, config: Optional[RunnableConfig] = None):
+        """Async call_llm(); SQLite access runs in a worker thread.
+        
+        Pass the node's config: before Python 3.11 asyncio tasks don't carry the
+        callback context, so without it the LLM's tokens never reach astream().
+        """
+        if self.llm_cache is None:
+            return await llm.ainvoke(prompt, config=config)
+        
+        key = self.llm_cache_key(llm, prompt)
+        content = await asyncio.to_thread(self.llm_cache.get, key)
+        if content is not None:
+            return self.cached_response(content)
+        
+        response = await llm.ainvoke(prompt, config=config)
+        await asyncio.to_thread(self.llm_cache.put, key, llm.model_name, response.content)
+        return response
     
     def free_input_guardrails(self, state: MathAgentState) -> Dict[str, Any]:
         """Free basic input validation"""
@@ -79,11 +168,87 @@ class CostOptimizedMathAgent:
         
         return {"guardrail_passed": True}
     
-    def smart_route_question(self, state: MathAgentState) -> Dict[str, Any]:
-        """Smart routing using cost-effective model"""
-        question = state["question"]
+    def exact_match_lookup(self, state: MathAgentState) -> Dict[str, Any]:
+        """Free fast path for problems already in the knowledge base verbatim"""
+        if not settings.EXACT_MATCH_ENABLED:
+            return {"exact_match": False}
+        
+        start_time = time.time()
+        match = get_math_kb().lookup_exact(state["question"])
+        if not match:
+            return {"exact_match": False}
+        
+        return {
+            "exact_match": True,
+            "route_decision": "exact_match",
+            "solution": match["solution"],
+            "confidence_score": 1.0,
+            "needs_human_feedback": False,
+            "processing_time": time.time() - start_time,
+            "tokens_used": 0,
+            "cost_estimate": 0.0
+        }
+    
+    def answer_cache_lookup(self, state: MathAgentState) -> Dict[str, Any]:
+        """Reuse the answer to a previously solved paraphrase of the question"""
+        if self.answer_cache is None:
+            return {"answer_cache_hit": False}
+        
+        try:
+            start_time = time.time()
+            vector = get_math_kb().embed_query(state["question"])
+            cached = self.answer_cache.lookup(state["question"], vector)
+        except Exception as e:
+            print(f"Answer cache lookup failed: {e}")
+            return {"answer_cache_hit": False, **self.node_error("check_answer_cache", f"{type(e).__name__}: {e}")}
+        
+        if not cached:
+            return {"answer_cache_hit": False}
+        
+        return {
+            "answer_cache_hit": True,
+            "route_decision": "answer_cache",
+            "solution": cached["solution"],
+            "confidence_score": cached["confidence_score"],
+            "needs_human_feedback": False,
+            "processing_time": time.time() - start_time,
+            "tokens_used": 0,
+            "cost_estimate": 0.0
+        }
+    
+    async def aanswer_cache_lookup(self, state: MathAgentState) -> Dict[str, Any]:
+        """Async answer_cache_lookup(); query encoding runs in a worker thread"""
+        return await asyncio.to_thread(self.answer_cache_lookup, state)
+    
+    def store_answer(self, state: MathAgentState) -> Dict[str, Any]:
+        """Add confident generated solutions to the answer cache"""
+        if self.answer_cache is None or state.get("answer_cache_hit"):
+            return {}
+        
+        if state.get("confidence_score", 0.0) < settings.ANSWER_CACHE_MIN_CONFIDENCE:
+            return {}
         
-        routing_prompt = f"""Analyze this mathematics question and decide the best information source.
+        try:
+            vector = get_math_kb().embed_query(state["question"])
+            self.answer_cache.add(
+                state["question"],
+                vector,
+                state["solution"],
+                state["confidence_score"],
+                state.get("route_decision", "")
+            )
+        except Exception as e:
+            print(f"Answer cache store failed: {e}")
+            return self.node_error("store_answer", f"{type(e).__name__}: {e}")
+        
+        return {}
+    
+    async def astore_answer(self, state: MathAgentState) -> Dict[str, Any]:
+        """Async store_answer(); encoding and the cache write run in a worker thread"""
+        return await asyncio.to_thread(self.store_answer, state)
+    
+    def build_routing_prompt(self, question: str) -> str:
+        return f"""Analyze this mathematics question and decide the best information source.
 
 Question: "{question}"
 
@@ -98,93 +263,253 @@ Guidelines:
 - Use "both" sparingly for complex research-level questions
 
 Respond with exactly one word: knowledge_base, web_search, or both"""
+    
+    def parse_route(self, routing_prompt: str, response, processing_time: float) -> Dict[str, Any]:
+        """Track router usage and validate its answer"""
+        # Track usage
+        usage = self.track_usage("route_question", settings.ROUTER_MODEL, routing_prompt, response)
+        
+        route = response.content.strip().lower()
+        
+        # Validate response
+        valid_routes = ["knowledge_base", "web_search", "both"]
+        if route not in valid_routes:
+            route = "knowledge_base"  # Safe fallback
+        
+        return {
+            "route_decision": route,
+            "route_source": "llm",
+            "processing_time": processing_time,
+            "usage": [usage]
+        }
+    
+    def routing_failed(self, error: Exception) -> Dict[str, Any]:
+        print(f"Routing failed: {error}")
+        return {
+            "route_decision": "knowledge_base",
+            "route_source": "fallback",
+            "processing_time": 0.0,
+            **self.node_error("route_question", f"{type(error).__name__}: {error}")
+        }
+    
+    def record_speculation(self, route: str) -> bool:
+        """Count a speculative KB search and return whether the route wants its results"""
+        used = route in KB_ROUTES
+        with self._speculation_lock:
+            self.speculations += 1
+            if not used:
+                self.wasted_speculations += 1
+        return used
+    
+    def speculation_stats(self) -> Dict[str, float]:
+        with self._speculation_lock:
+            return {
+                "speculations": self.speculations,
+                "wasted": self.wasted_speculations,
+                "wasted_rate": self.wasted_speculations / self.speculations if self.speculations else 0.0
+            }
+    
+    def local_route(self, question: str) -> Optional[Dict[str, Any]]:
+        """Route with the local classifier, or None when it is unsure or disabled"""
+        if self.local_router is None:
+            return None
+        try:
+            start_time = time.time()
+            route = self.local_router.route(question)
+        except Exception as e:
+            print(f"Local routing failed: {e}")
+            return None
+        if route is None:
+            return None
+        return {
+            "route_decision": route,
+            "route_source": "local",
+            "processing_time": time.time() - start_time
+        }
+    
+    def smart_route_question(self, state: MathAgentState) -> Dict[str, Any]:
+        """Smart routing using cost-effective model.
+        
+        A confident local classifier decides without any network call; only
+        uncertain questions go to the router LLM. With SPECULATIVE_KB_SEARCH the
+        KB search starts while the LLM is thinking. When the route includes the
+        KB, search_kb picks up the in-flight search via speculation_id; otherwise
+        it is cancelled and counted as wasted.
+        """
+        local = self.local_route(state["question"])
+        if local is not None:
+            return local
+        
+        routing_prompt = self.build_routing_prompt(state["question"])
+        speculation_id = None
+        if settings.SPECULATIVE_KB_SEARCH:
+            speculation_id = uuid.uuid4().hex
+            self.speculative_searches[speculation_id] = SPECULATION_EXECUTOR.submit(
+                self.search_knowledge_base_node, {"question": state["question"]}
+            )
         
         try:
             start_time = time.time()
-            response = self.llm_router.invoke(routing_prompt)
-            processing_time = time.time() - start_time
-            
-            # Track usage
-            estimated_tokens = len(routing_prompt.split()) + 10
-            self.track_usage(estimated_tokens, settings.ROUTER_MODEL)
-            
-            route = response.content.strip().lower()
-            
-            # Validate response
-            valid_routes = ["knowledge_base", "web_search", "both"]
-            if route not in valid_routes:
-                route = "knowledge_base"  # Safe fallback
-            
-            return {
-                "route_decision": route,
-                "processing_time": processing_time
-            }
-            
+            response = self.call_llm(self.llm_router, routing_prompt)
+            update = self.parse_route(routing_prompt, response, time.time() - start_time)
         except Exception as e:
-            print(f"Routing failed: {e}")
-            return {
-                "route_decision": "knowledge_base",
-                "processing_time": 0.0
-            }
+            update = self.routing_failed(e)
+        
+        if speculation_id is None:
+            return update
+        if not self.record_speculation(update["route_decision"]):
+            self.speculative_searches.pop(speculation_id).cancel()
+            return update
+        return {**update, "speculation_id": speculation_id}
+    
+    async def asmart_route_question(self, state: MathAgentState, config: RunnableConfig) -> Dict[str, Any]:
+        """Async smart_route_question()"""
+        local = await asyncio.to_thread(self.local_route, state["question"])
+        if local is not None:
+            return local
+        
+        routing_prompt = self.build_routing_prompt(state["question"])
+        speculation_id = None
+        if settings.SPECULATIVE_KB_SEARCH:
+            speculation_id = uuid.uuid4().hex
+            self.speculative_searches[speculation_id] = asyncio.create_task(
+                self.asearch_knowledge_base_node({"question": state["question"]})
+            )
+        
+        try:
+            start_time = time.time()
+            response = await self.acall_llm(self.llm_router, routing_prompt, config)
+            update = self.parse_route(routing_prompt, response, time.time() - start_time)
+        except Exception as e:
+            update = self.routing_failed(e)
+        
+        if speculation_id is None:
+            return update
+        if not self.record_speculation(update["route_decision"]):
+            self.speculative_searches.pop(speculation_id).cancel()
+            return update
+        return {**update, "speculation_id": speculation_id}
+    
+    def format_kb_results(self, results: List[Dict]) -> Dict[str, Any]:
+        if not results:
+            return {"knowledge_base_results": "No relevant problems found in knowledge base."}
+        
+        formatted_results = []
+        for i, result in enumerate(results):
+            formatted_results.append(
+                f"Example {i+1}:\n"
+                f"Problem: {result['problem']}\n"
+                f"Solution: {result['solution_snippet']}{'...' if result['solution_truncated'] else ''}\n"
+                f"Topic: {result['topic']} | Difficulty: {result['difficulty']}\n"
+                f"Relevance Score: {result['score']:.2f}\n"
+                f"---"
+            )
+        
+        return {"knowledge_base_results": "\n".join(formatted_results), "knowledge_base_hits": results}
+    
+    def node_error(self, node: str, message: str) -> Dict[str, Any]:
+        """A failure a node handled itself, recorded in state so its trace span shows it"""
+        return {"errors": [{"node": node, "error": message}]}
+    
+    def kb_search_failed(self, message: str) -> Dict[str, Any]:
+        return {
+            "knowledge_base_results": f"Knowledge base search failed: {message}",
+            **self.node_error("search_kb", message)
+        }
+    
+    def web_search_failed(self, message: str) -> Dict[str, Any]:
+        return {
+            "web_search_results": f"Web search failed: {message}",
+            **self.node_error("search_web", message)
+        }
+    
+    def format_web_results(self, results: str) -> Dict[str, Any]:
+        # The search tool reports its own failures as text
+        if results.startswith("Web search failed: "):
+            return self.web_search_failed(results[len("Web search failed: "):])
+        return {"web_search_results": results}
     
     def search_knowledge_base_node(self, state: MathAgentState) -> Dict[str, Any]:
         """Search internal knowledge base"""
+        speculation = self.speculative_searches.pop(state.get("speculation_id"), None)
+        if speculation is not None:
+            return speculation.result()  # Started during routing
+        
         try:
-            results = math_kb.search(state["question"], limit=3)
-            
-            if not results:
-                return {"knowledge_base_results": "No relevant problems found in knowledge base."}
-            
-            formatted_results = []
-            for i, result in enumerate(results):
-                formatted_results.append(
-                    f"Example {i+1}:\n"
-                    f"Problem: {result['problem']}\n"
-                    f"Solution: {result['solution'][:600]}{'...' if len(result['solution']) > 600 else ''}\n"
-                    f"Topic: {result['topic']} | Difficulty: {result['difficulty']}\n"
-                    f"Relevance Score: {result['score']:.2f}\n"
-                    f"---"
-                )
-            
-            return {"knowledge_base_results": "\n".join(formatted_results)}
-            
+            # The packer picks steps from the whole solution, not the display snippet
+            future = SEARCH_EXECUTOR.submit(
+                get_math_kb().search, state["question"], limit=3, full_solution=True, raise_errors=True
+            )
+            results = future.result(timeout=settings.KB_SEARCH_TIMEOUT)
+            return self.format_kb_results(results)
+        except FutureTimeoutError:
+            future.cancel()  # Still queued behind other searches, so never start it
+            return self.kb_search_failed(f"timed out after {settings.KB_SEARCH_TIMEOUT}s")
         except Exception as e:
-            return {"knowledge_base_results": f"Knowledge base search failed: {str(e)}"}
+            return self.kb_search_failed(f"{type(e).__name__}: {e}")
+    
+    async def asearch_knowledge_base_node(self, state: MathAgentState) -> Dict[str, Any]:
+        """Async search_knowledge_base_node()"""
+        speculation = self.speculative_searches.pop(state.get("speculation_id"), None)
+        if speculation is not None:
+            return await speculation  # Started during routing
+        
+        try:
+            results = await asyncio.wait_for(
+                get_math_kb().asearch(state["question"], limit=3, full_solution=True, raise_errors=True),
+                timeout=settings.KB_SEARCH_TIMEOUT
+            )
+            return self.format_kb_results(results)
+        except asyncio.TimeoutError:
+            return self.kb_search_failed(f"timed out after {settings.KB_SEARCH_TIMEOUT}s")
+        except Exception as e:
+            return self.kb_search_failed(f"{type(e).__name__}: {e}")
     
     def search_web_node(self, state: MathAgentState) -> Dict[str, Any]:
         """Search web using free DuckDuckGo"""
         try:
-            results = web_search_tool.search_mathematics(state["question"])
-            return {"web_search_results": results}
+            future = SEARCH_EXECUTOR.submit(get_web_search_tool().search_mathematics, state["question"])
+            results = future.result(timeout=settings.WEB_SEARCH_TIMEOUT)
+            return self.format_web_results(results)
+        except FutureTimeoutError:
+            future.cancel()  # Still queued behind other searches, so never start it
+            return self.web_search_failed(f"timed out after {settings.WEB_SEARCH_TIMEOUT}s")
+        except Exception as e:
+            return self.web_search_failed(f"{type(e).__name__}: {e}")
+    
+    async def asearch_web_node(self, state: MathAgentState) -> Dict[str, Any]:
+        """Async search_web_node()"""
+        try:
+            results = await asyncio.wait_for(
+                get_web_search_tool().asearch_mathematics(state["question"]),
+                timeout=settings.WEB_SEARCH_TIMEOUT
+            )
+            return self.format_web_results(results)
+        except asyncio.TimeoutError:
+            return self.web_search_failed(f"timed out after {settings.WEB_SEARCH_TIMEOUT}s")
         except Exception as e:
-            return {"web_search_results": f"Web search failed: {str(e)}"}
+            return self.web_search_failed(f"{type(e).__name__}: {e}")
+    
+    def search_targets(self, state: MathAgentState) -> List[str]:
+        """Search nodes for the chosen route; "both" fans out to run them in parallel"""
+        route = state["route_decision"]
+        if route == "both":
+            return ["search_kb", "search_web"]
+        if route == "web_search":
+            return ["search_web"]
+        return ["search_kb"]
     
     def combine_context(self, state: MathAgentState) -> Dict[str, Any]:
-        """Combine information from different sources"""
-        context_parts = []
-        
-        # Add knowledge base results
-        if state.get("knowledge_base_results") and "No relevant" not in state["knowledge_base_results"]:
-            context_parts.append("=== SIMILAR PROBLEMS FROM KNOWLEDGE BASE ===")
-            context_parts.append(str(state["knowledge_base_results"]))
-        
-        # Add web search results  
-        if state.get("web_search_results") and "failed" not in state["web_search_results"].lower():
-            context_parts.append("=== CURRENT INFORMATION FROM WEB ===")
-            context_parts.append(str(state["web_search_results"]))
+        """Combine information from different sources within the context token budget"""
+        web_results = state.get("web_search_results") or ""
+        if "failed" in web_results.lower():
+            web_results = ""
         
-        context = "\n\n".join(context_parts) if context_parts else "Limited context available. Will use mathematical knowledge to solve."
-        
-        # Truncate context to control costs
-        if len(context) > settings.MAX_CONTEXT_LENGTH:
-            context = context[:settings.MAX_CONTEXT_LENGTH] + "\n...[context truncated for efficiency]"
-        
-        return {"context": context}
+        context = self.context_packer.pack(state["question"], state.get("knowledge_base_hits"), web_results)
+        return {"context": context or "Limited context available. Will use mathematical knowledge to solve."}
     
-    def generate_solution(self, state: MathAgentState) -> Dict[str, Any]:
-        """Generate solution using premium model"""
-        
-        solution_prompt = f"""You are an expert mathematics tutor. Provide a clear, step-by-step solution for this question.
+    def build_solution_prompt(self, state: MathAgentState) -> str:
+        return f"""You are an expert mathematics tutor. Provide a clear, step-by-step solution for this question.
 
     Question: {state["question"]}
 
@@ -205,37 +530,59 @@ Respond with exactly one word: knowledge_base, web_search, or both"""
     Step 2: [explanation with work]
     ...
     **Final Answer:** [clear final result]"""
+    
+    def parse_solution(self, state: MathAgentState, solution_prompt: str, response, processing_time: float) -> Dict[str, Any]:
+        """Track generator usage and score the solution"""
+        # Track usage
+        usage = self.track_usage("generate_solution", settings.GENERATOR_MODEL, solution_prompt, response)
+        request_usage = summarize(state.get("usage", []) + [usage])
+        
+        # Calculate confidence
+        confidence = self.calculate_confidence(state["context"], response.content)
+        
+        return {
+            "solution": response.content,
+            "confidence_score": confidence,
+            "needs_human_feedback": confidence < 0.7,
+            "processing_time": processing_time,
+            "tokens_used": request_usage["tokens"],
+            "cost_estimate": request_usage["cost"],
+            "usage": [usage]
+        }
+    
+    def generation_failed(self, state: MathAgentState, error: Exception) -> Dict[str, Any]:
+        request_usage = summarize(state.get("usage"))
+        return {
+            "solution": f"I apologize, but I encountered an error generating the solution: {str(error)}",
+            "confidence_score": 0.0,
+            "needs_human_feedback": True,
+            "processing_time": 0.0,
+            "tokens_used": request_usage["tokens"],
+            "cost_estimate": request_usage["cost"],
+            **self.node_error("generate_solution", f"{type(error).__name__}: {error}")
+        }
+    
+    def generate_solution(self, state: MathAgentState) -> Dict[str, Any]:
+        """Generate solution using premium model"""
+        solution_prompt = self.build_solution_prompt(state)
         
         try:
             start_time = time.time()
-            response = self.llm_generator.invoke(solution_prompt)
-            processing_time = time.time() - start_time
-            
-            # Track usage
-            estimated_tokens = len(solution_prompt.split()) + len(response.content.split())
-            self.track_usage(estimated_tokens, settings.GENERATOR_MODEL)
-            
-            # Calculate confidence
-            confidence = self.calculate_confidence(state["context"], response.content)
-            
-            return {
-                "solution": response.content,
-                "confidence_score": confidence,
-                "needs_human_feedback": confidence < 0.7,
-                "processing_time": processing_time,
-                "tokens_used": estimated_tokens,
-                "cost_estimate": self.total_cost
-            }
-            
+            response = self.call_llm(self.llm_generator, solution_prompt)
+            return self.parse_solution(state, solution_prompt, response, time.time() - start_time)
         except Exception as e:
-            return {
-                "solution": f"I apologize, but I encountered an error generating the solution: {str(e)}",
-                "confidence_score": 0.0,
-                "needs_human_feedback": True,
-                "processing_time": 0.0,
-                "tokens_used": 0,
-                "cost_estimate": self.total_cost
-            }
+            return self.generation_failed(state, e)
+    
+    async def agenerate_solution(self, state: MathAgentState, config: RunnableConfig) -> Dict[str, Any]:
+        """Async generate_solution()"""
+        solution_prompt = self.build_solution_prompt(state)
+        
+        try:
+            start_time = time.time()
+            response = await self.acall_llm(self.llm_generator, solution_prompt, config)
+            return self.parse_solution(state, solution_prompt, response, time.time() - start_time)
+        except Exception as e:
+            return self.generation_failed(state, e)
     
     def calculate_confidence(self, context: str, solution: str) -> float:
         """Calculate confidence score based on context and solution quality"""
@@ -284,18 +631,34 @@ Respond with exactly one word: knowledge_base, web_search, or both"""
         
         return {"solution": solution}
     
-    def create_workflow(self) -> StateGraph:
-        """Create optimized LangGraph workflow"""
+    def create_workflow(self, use_async: bool = False) -> StateGraph:
+        """Create optimized LangGraph workflow.
+        
+        With use_async=True the network-bound nodes are coroutines, and the
+        compiled graph must be driven with ainvoke()/astream(); many questions
+        can then share one event loop. CPU-only nodes are the same in both.
+        """
         workflow = StateGraph(MathAgentState)
         
+        # Every node records a tracing span; finalize_trace exports the request's trace
+        def add_node(name: str, node):
+            workflow.add_node(name, self.tracer.wrap(name, node) if self.tracer else node)
+        done = "finalize_trace" if self.tracer else END
+        
         # Add all nodes
-        workflow.add_node("input_guardrails", self.free_input_guardrails)
-        workflow.add_node("route_question", self.smart_route_question)
-        workflow.add_node("search_kb", self.search_knowledge_base_node)
-        workflow.add_node("search_web", self.search_web_node)
-        workflow.add_node("combine_context", self.combine_context)
-        workflow.add_node("generate_solution", self.generate_solution)
-        workflow.add_node("output_guardrails", self.free_output_guardrails)
+        add_node("input_guardrails", self.free_input_guardrails)
+        add_node("check_exact_match", self.exact_match_lookup)
+        add_node("check_answer_cache", self.aanswer_cache_lookup if use_async else self.answer_cache_lookup)
+        add_node("route_question", self.asmart_route_question if use_async else self.smart_route_question)
+        add_node("search_kb", self.asearch_knowledge_base_node if use_async else self.search_knowledge_base_node)
+        add_node("search_web", self.asearch_web_node if use_async else self.search_web_node)
+        add_node("combine_context", self.combine_context)
+        add_node("generate_solution", self.agenerate_solution if use_async else self.generate_solution)
+        add_node("output_guardrails", self.free_output_guardrails)
+        add_node("store_answer", self.astore_answer if use_async else self.store_answer)
+        
+        if self.tracer:
+            workflow.add_node("finalize_trace", self.tracer.finalize)
         
         # Set entry point
         workflow.set_entry_point("input_guardrails")
@@ -305,42 +668,62 @@ Respond with exactly one word: knowledge_base, web_search, or both"""
             "input_guardrails",
             lambda state: "proceed" if state.get("guardrail_passed", False) else "blocked",
             {
-                "proceed": "route_question",
-                "blocked": END
+                "proceed": "check_exact_match",
+                "blocked": done
             }
         )
         
+        # Known problems skip the LLMs entirely
         workflow.add_conditional_edges(
-            "route_question", 
-            lambda state: state["route_decision"],
+            "check_exact_match",
+            lambda state: "hit" if state.get("exact_match", False) else "miss",
             {
-                "knowledge_base": "search_kb",
-                "web_search": "search_web",
-                "both": "search_kb"  # Start with KB, then web
+                "hit": done,
+                "miss": "check_answer_cache"
             }
         )
         
-        workflow.add_edge("search_kb", "combine_context")
-        workflow.add_edge("search_web", "combine_context")
+        # Paraphrases of solved questions reuse the cached answer
+        workflow.add_conditional_edges(
+            "check_answer_cache",
+            lambda state: "hit" if state.get("answer_cache_hit", False) else "miss",
+            {
+                "hit": done,
+                "miss": "route_question"
+            }
+        )
         
-        # Handle "both" route
+        # "both" runs KB and web search as parallel branches of the same step
         workflow.add_conditional_edges(
-            "combine_context",
-            lambda state: "search_web" if (
-                state["route_decision"] == "both" and 
-                not state.get("web_search_results")
-            ) else "generate",
+            "route_question",
+            self.search_targets,
             {
-                "search_web": "search_web",
-                "generate": "generate_solution"
+                "search_kb": "search_kb",
+                "search_web": "search_web"
             }
         )
         
+        # Branches join here, so context is assembled once per question
+        workflow.add_edge("search_kb", "combine_context")
+        workflow.add_edge("search_web", "combine_context")
+        workflow.add_edge("combine_context", "generate_solution")
+        
         workflow.add_edge("generate_solution", "output_guardrails")
-        workflow.add_edge("output_guardrails", END)
+        workflow.add_edge("output_guardrails", "store_answer")
+        workflow.add_edge("store_answer", done)
+        if self.tracer:
+            workflow.add_edge("finalize_trace", END)
         
         return workflow.compile()
     
+def warmup():
+    """Load the embedding model, vector store and search clients ahead of the first request"""
+    start_time = time.time()
+    kb = get_math_kb()
+    kb.embed_query("warmup")
+    get_web_search_tool().ddg
+    print(f"🔥 Warmup complete in {time.time() - start_time:.1f}s")
+
 def get_math_agent():
     """Factory function to create math agent"""
     return CostOptimizedMathAgent()
@@ -348,4 +731,38 @@ def get_math_agent():
 def get_workflow():
     """Factory function to create workflow"""
     agent = get_math_agent()
-    return agent.create_workflow(), agent
\ No newline at end of file
+    return agent.create_workflow(), agent
+
+def stream_solution(workflow, state: MathAgentState) -> Iterator[Tuple[str, Any]]:
+    """Run the workflow, yielding ("token", text) as the solution is generated and finally ("result", state).
+    
+    stream_mode="messages" surfaces the generator's tokens while it is still
+    writing; the final state carries the solution after output guardrails and
+    confidence scoring, which only run on the completed text.
+    """
+    result = None
+    for mode, chunk in workflow.stream(state, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result = chunk
+            continue
+        message, metadata = chunk
+        if metadata.get("langgraph_node") == "generate_solution" and message.content:
+            yield "token", message.content
+    yield "result", result
+
+async def astream_solution(workflow, state: MathAgentState) -> AsyncIterator[Tuple[str, Any]]:
+    """Async stream_solution() for workflows from get_async_workflow()"""
+    result = None
+    async for mode, chunk in workflow.astream(state, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result = chunk
+            continue
+        message, metadata = chunk
+        if metadata.get("langgraph_node") == "generate_solution" and message.content:
+            yield "token", message.content
+    yield "result", result
+
+def get_async_workflow():
+    """Factory function to create a workflow for ainvoke()/astream()"""
+    agent = get_math_agent()
+    return agent.create_workflow(use_async=True), agent
\ No newline at end of file
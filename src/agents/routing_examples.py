@@ -0,0 +1,55 @@
+# Labeled routing examples for the local router, following the router prompt's guidelines
+KNOWLEDGE_BASE_EXAMPLES = [
+    "Solve the quadratic equation x² - 5x + 6 = 0",
+    "Differentiate g(x) = 3x⁴ + sin(x)",
+    "Evaluate the integral of x·e^x dx",
+    "Explain what a derivative means geometrically",
+    "What is the Pythagorean theorem and how do I use it?",
+    "Simplify (3x²y)(4xy³)",
+    "Solve the system of equations x + y = 10 and x - y = 2",
+    "Find the area of a circle with radius 7 cm",
+    "What is the limit of sin(x)/x as x approaches 0?",
+    "How many ways can 5 people sit in a row?",
+    "Factor x² - 9x + 20",
+    "Prove that the square root of 2 is irrational",
+    "Calculate the mean and standard deviation of 4, 8, 15, 16, 23, 42",
+    "A train travels 120 miles in 2 hours. What is its average speed?",
+    "Find the eigenvalues of the matrix [[2, 1], [1, 2]]",
+    "What is the chain rule in differentiation?",
+    "Solve log₂(x) + log₂(x - 2) = 3",
+    "Find the sum of the arithmetic series 3 + 7 + 11 + ... + 99",
+    "What is the probability of rolling two sixes with two dice?",
+    "Convert 0.375 to a fraction in lowest terms",
+]
+
+WEB_SEARCH_EXAMPLES = [
+    "What are the latest advances in automated theorem proving?",
+    "Who won the most recent Fields Medal?",
+    "What is the current status of the twin prime conjecture research?",
+    "Has anyone recently announced a proof of the abc conjecture?",
+    "What are the newest results on the Collatz conjecture this year?",
+    "Which math competitions are happening this month?",
+    "What did mathematicians discover about aperiodic monotiles recently?",
+    "Latest news about AI systems solving olympiad geometry problems",
+    "What are current applications of topology in modern machine learning?",
+    "What recent breakthroughs have there been in the sphere packing problem?",
+    "Who are the current leading researchers in quantum computing algorithms?",
+    "What new records were set recently for computing digits of pi?",
+]
+
+BOTH_EXAMPLES = [
+    "How has the approach to the Riemann hypothesis evolved from Riemann to current research?",
+    "Explain the Langlands program and where the latest progress stands",
+    "What is Fermat's Last Theorem, and how is Wiles' proof being formalized in Lean today?",
+    "Explain elliptic curve cryptography and its current post-quantum alternatives",
+    "Explain the P vs NP problem and the latest approaches researchers are pursuing",
+    "What is the Navier–Stokes existence problem and what is the current state of research on it?",
+    "Explain Ramsey numbers and recent improvements to their upper bounds",
+    "How do neural networks approximate functions, and what are the newest theoretical results?",
+]
+
+ROUTING_EXAMPLES = (
+    [{"question": question, "route": "knowledge_base"} for question in KNOWLEDGE_BASE_EXAMPLES]
+    + [{"question": question, "route": "web_search"} for question in WEB_SEARCH_EXAMPLES]
+    + [{"question": question, "route": "both"} for question in BOTH_EXAMPLES]
+)
@@ -1,14 +1,20 @@
-from typing import TypedDict, List, Optional, Any
+import operator
+from typing import Annotated, Dict, TypedDict, List, Optional, Any
 
 class MathAgentState(TypedDict):
     # Input
     question: str
     
     # Routing
-    route_decision: str  # "knowledge_base", "web_search", "both"
+    route_decision: str  # "knowledge_base", "web_search", "both", "exact_match", "answer_cache"
+    route_source: str  # "local", "llm" or "fallback"
+    exact_match: bool
+    answer_cache_hit: bool
+    speculation_id: Optional[str]  # KB search started during routing, picked up by search_kb
     
     # Search results
     knowledge_base_results: str
+    knowledge_base_hits: List[Dict]  # formatted KB hits with scores, packed into the context
     web_search_results: str
     context: str
     
@@ -20,8 +26,12 @@ class MathAgentState(TypedDict):
     # Safety & validation
     guardrail_passed: bool
     error_message: Optional[str]
+    errors: Annotated[List[Dict], operator.add]  # failures a node handled itself: node, error
     
     # Metadata
     processing_time: float
-    tokens_used: int
-    cost_estimate: float
\ No newline at end of file
+    tokens_used: int  # this request only
+    cost_estimate: float  # this request only, in USD
+    usage: Annotated[List[Dict], operator.add]  # one entry per LLM call: node, model, input/output tokens, cost
+    trace_id: str
+    trace: Annotated[List[Dict], operator.add]  # one span per node run
\ No newline at end of file
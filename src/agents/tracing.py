@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from src.config.settings import settings
+
+class JsonlTraceExporter:
+    """Append one JSON line per request trace to a local file.
+
+    Once the file reaches max_bytes it is rotated to "<path>.1", replacing the
+    previous rotation, so at most about twice that much is kept on disk.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path or settings.TRACE_JSONL_PATH)
+        self.max_bytes = settings.TRACE_JSONL_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        try:
+            if self.max_bytes > 0 and self.path.stat().st_size >= self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+        except FileNotFoundError:
+            pass
+
+    def export(self, trace: Dict):
+        line = json.dumps(trace, ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._rotate()
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+class OtlpTraceExporter:
+    """Send request traces to an OpenTelemetry collector over OTLP.
+
+    Each request becomes a root span with one child span per node, carrying
+    the recorded timestamps and attributes. The collector endpoint comes from
+    the standard OTEL_EXPORTER_OTLP_ENDPOINT environment variable.
+    """
+
+    def __init__(self):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        self._otel_trace = otel_trace
+        self.provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACE_SERVICE_NAME}))
+        self.provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        self.tracer = self.provider.get_tracer("math_agent")
+
+    def _attributes(self, attributes: Dict) -> Dict:
+        """OTLP attributes must be primitives"""
+        return {
+            key: value if isinstance(value, (str, bool, int, float)) else json.dumps(value, default=str)
+            for key, value in attributes.items()
+            if value is not None
+        }
+
+    def export(self, trace: Dict):
+        root = self.tracer.start_span(
+            "math_agent.request",
+            start_time=int(trace["start_time"] * 1e9),
+            attributes=self._attributes({"trace_id": trace["trace_id"], "route": trace["route"]})
+        )
+        context = self._otel_trace.set_span_in_context(root)
+        for span in trace["spans"]:
+            child = self.tracer.start_span(
+                span["name"],
+                context=context,
+                start_time=int(span["start_time"] * 1e9),
+                attributes=self._attributes(span["attributes"])
+            )
+            if span.get("error"):
+                child.set_status(self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span["error"]))
+            child.end(end_time=int(span["end_time"] * 1e9))
+        root.end(end_time=int(trace["end_time"] * 1e9))
+
+def create_exporters() -> List:
+    """Exporters named in settings.TRACE_EXPORTERS; unavailable ones are skipped"""
+    exporters = []
+    for name in filter(None, (part.strip() for part in settings.TRACE_EXPORTERS.split(","))):
+        try:
+            if name == "jsonl":
+                exporters.append(JsonlTraceExporter())
+            elif name == "otlp":
+                exporters.append(OtlpTraceExporter())
+            else:
+                print(f"⚠️ Unknown trace exporter: {name}")
+        except Exception as e:
+            print(f"⚠️ Trace exporter {name} unavailable: {e}")
+    return exporters
+
+class Tracer:
+    """Records a span for every workflow node and exports one trace per request.
+
+    Wrapped nodes add their span to the "trace" state field, so parallel
+    branches never overwrite each other, and finalize() ships the collected
+    spans to every exporter at the end of the request.
+    """
+
+    def __init__(self, exporters: Optional[List] = None):
+        self.exporters = create_exporters() if exporters is None else exporters
+
+    def _attributes(self, name: str, state: Dict, update: Optional[Dict]) -> Dict:
+        merged = {**state, **(update or {})}
+        usage = (update or {}).get("usage", [])
+        attributes = {
+            "node": name,
+            "route": merged.get("route_decision") or None,
+            "route_source": merged.get("route_source"),
+            "exact_match": merged.get("exact_match"),
+            "answer_cache_hit": merged.get("answer_cache_hit"),
+            "input_tokens": sum(entry["input_tokens"] for entry in usage) if usage else None,
+            "output_tokens": sum(entry["output_tokens"] for entry in usage) if usage else None,
+            "llm_cache_hit": any(entry["source"] == "cache" for entry in usage) if usage else None,
+            "error_message": (update or {}).get("error_message"),
+            "handled_errors": len((update or {}).get("errors", [])) or None
+        }
+        return {key: value for key, value in attributes.items() if value is not None}
+
+    def _span(self, name: str, state: Dict, update: Optional[Dict], start_time: float,
+              elapsed: float, error: Optional[BaseException]) -> Dict:
+        # Failures the node handled itself come back in the "errors" field
+        handled = "; ".join(entry["error"] for entry in (update or {}).get("errors", []))
+        return {
+            "span_id": uuid.uuid4().hex[:16],
+            "name": name,
+            "start_time": start_time,
+            "end_time": start_time + elapsed,
+            "duration_ms": elapsed * 1000,
+            "attributes": self._attributes(name, state, update),
+            "error": f"{type(error).__name__}: {error}" if error else handled or None
+        }
+
+    def _with_span(self, state: Dict, update: Optional[Dict], span: Dict) -> Dict:
+        traced = {**(update or {}), "trace": [span]}
+        if not state.get("trace_id"):
+            traced["trace_id"] = uuid.uuid4().hex  # Only the entry node sees no trace_id
+        return traced
+
+    def wrap(self, name: str, node: Callable) -> Callable:
+        """Wrap a sync or async node so each call records a span.
+        
+        The wrapper reports the node's signature, so LangGraph injects the same
+        keyword arguments (such as config) and the wrapper passes them through.
+        """
+        if asyncio.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def traced_async_node(state: Dict, **kwargs) -> Dict:
+                start_time, start = time.time(), time.perf_counter()
+                try:
+                    update = await node(state, **kwargs)
+                except BaseException as e:
+                    self._failed(name, state, start_time, time.perf_counter() - start, e)
+                    raise
+                span = self._span(name, state, update, start_time, time.perf_counter() - start, None)
+                return self._with_span(state, update, span)
+            return traced_async_node
+
+        @functools.wraps(node)
+        def traced_node(state: Dict, **kwargs) -> Dict:
+            start_time, start = time.time(), time.perf_counter()
+            try:
+                update = node(state, **kwargs)
+            except BaseException as e:
+                self._failed(name, state, start_time, time.perf_counter() - start, e)
+                raise
+            span = self._span(name, state, update, start_time, time.perf_counter() - start, None)
+            return self._with_span(state, update, span)
+        return traced_node
+
+    def _failed(self, name: str, state: Dict, start_time: float, elapsed: float, error: BaseException):
+        """A raising node aborts the graph before finalize(), so export what we have now"""
+        span = self._span(name, state, None, start_time, elapsed, error)
+        self.export(state.get("trace_id") or uuid.uuid4().hex, state, list(state.get("trace", [])) + [span])
+
+    def export(self, trace_id: str, state: Dict, spans: List[Dict]) -> Dict:
+        start_time = min((span["start_time"] for span in spans), default=time.time())
+        end_time = max((span["end_time"] for span in spans), default=start_time)
+        trace = {
+            "trace_id": trace_id,
+            "question": state.get("question"),
+            "route": state.get("route_decision") or None,
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration_ms": (end_time - start_time) * 1000,
+            "tokens_used": state.get("tokens_used", 0),
+            "cost_estimate": state.get("cost_estimate", 0.0),
+            "spans": sorted(spans, key=lambda span: span["start_time"])
+        }
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+        return trace
+
+    def finalize(self, state: Dict) -> Dict[str, Any]:
+        """Workflow node that exports the request's trace before END"""
+        self.export(state.get("trace_id") or uuid.uuid4().hex, state, state.get("trace", []))
+        return {}
@@ -0,0 +1,90 @@
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+from src.config.settings import settings
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model, or None when tiktoken or its encoding files are unavailable"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    """Local token count; roughly four characters per token without tiktoken"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, round(len(text) / 4)) if text else 0
+    return len(encoding.encode(text))
+
+def model_price(model: str) -> Dict[str, float]:
+    """USD per 1M input and output tokens from settings.MODEL_PRICES"""
+    return settings.MODEL_PRICES.get(model, settings.MODEL_PRICES["default"])
+
+def response_usage(node: str, model: str, prompt: str, response) -> Dict:
+    """Token usage of one LLM call.
+
+    Counts come from the provider's usage_metadata when present and are
+    otherwise counted locally, which the "source" field records.
+    """
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata:
+        input_tokens = metadata["input_tokens"]
+        output_tokens = metadata["output_tokens"]
+        source = "cache" if getattr(response, "response_metadata", {}).get("llm_cache_hit") else "provider"
+    else:
+        input_tokens = count_tokens(prompt, model)
+        output_tokens = count_tokens(response.content, model)
+        source = "tokenizer"
+
+    price = model_price(model)
+    return {
+        "node": node,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000,
+        "source": source
+    }
+
+class UsageTracker:
+    """Running token and cost totals per node and per model"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.total_tokens = 0
+        self.total_cost = 0.0
+        self.by_node: Dict[str, Dict[str, float]] = {}
+        self.by_model: Dict[str, Dict[str, float]] = {}
+
+    def record(self, usage: Dict):
+        with self._lock:
+            tokens = usage["input_tokens"] + usage["output_tokens"]
+            self.total_tokens += tokens
+            self.total_cost += usage["cost"]
+            for key, totals in ((usage["node"], self.by_node), (usage["model"], self.by_model)):
+                entry = totals.setdefault(key, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0})
+                entry["calls"] += 1
+                entry["input_tokens"] += usage["input_tokens"]
+                entry["output_tokens"] += usage["output_tokens"]
+                entry["cost"] += usage["cost"]
+
+def summarize(usage_entries: Optional[list]) -> Dict[str, float]:
+    """Per-request totals from the usage entries in the workflow state"""
+    entries = usage_entries or []
+    return {
+        "tokens": sum(entry["input_tokens"] + entry["output_tokens"] for entry in entries),
+        "cost": sum(entry["cost"] for entry in entries)
+    }
@@ -1,6 +1,7 @@
+import json
 import os
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Dict, Optional
 
 load_dotenv()
 
@@ -11,17 +12,85 @@ class Settings:
     
     # Database
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+    QDRANT_GRPC_PORT: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", "10"))  # seconds
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "qdrant")  # "qdrant" or "local"
+    LOCAL_INDEX_DIR: str = os.getenv("LOCAL_INDEX_DIR", ".cache/index")
+    LOCAL_INDEX_ANN: bool = os.getenv("LOCAL_INDEX_ANN", "false").lower() == "true"
+    LOCAL_INDEX_ANN_MIN_ROWS: int = int(os.getenv("LOCAL_INDEX_ANN_MIN_ROWS", "20000"))
+    LOCAL_INDEX_ANN_EF: int = int(os.getenv("LOCAL_INDEX_ANN_EF", "64"))
+    LOCAL_INDEX_FLUSH_ROWS: int = int(os.getenv("LOCAL_INDEX_FLUSH_ROWS", "20000"))  # staged upserts written to disk at this size
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none")  # "none", "int8" or "binary"
+    QUANTIZATION_OVERSAMPLING: float = float(os.getenv("QUANTIZATION_OVERSAMPLING", "3.0"))
     
     # Models
     ROUTER_MODEL: str = "gpt-3.5-turbo"
     GENERATOR_MODEL: str = "gpt-4o-mini"  # Cheaper than gpt-4
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-onnx")
+    ONNX_QUANTIZED: bool = os.getenv("ONNX_QUANTIZED", "false").lower() == "true"
+    ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 lets onnxruntime decide
     
     # Usage tracking
     TRACK_USAGE: bool = os.getenv("TRACK_USAGE", "false").lower() == "true"
+    # USD per 1M input/output tokens; MODEL_PRICES='{"model": {"input": x, "output": y}}' overrides entries
+    MODEL_PRICES: Dict[str, Dict[str, float]] = {
+        "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+        "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+        "default": {"input": 1.00, "output": 1.00},
+        **json.loads(os.getenv("MODEL_PRICES", "{}"))
+    }
+    
+    # Tracing
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_EXPORTERS: str = os.getenv("TRACE_EXPORTERS", "jsonl")  # comma-separated: "jsonl", "otlp"
+    TRACE_JSONL_PATH: str = os.getenv("TRACE_JSONL_PATH", ".cache/traces.jsonl")
+    TRACE_JSONL_MAX_BYTES: int = int(os.getenv("TRACE_JSONL_MAX_BYTES", "52428800"))  # rotate to .1 at this size; 0 for no cap
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "math-agent")
     
     # System settings
-    MAX_CONTEXT_LENGTH: int = 2000
-    MAX_PROBLEMS_KB: int = 1500
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "500"))  # generator-model tokens of retrieved context
+    CONTEXT_MAX_STEPS: int = int(os.getenv("CONTEXT_MAX_STEPS", "3"))  # solution steps kept per example
+    CONTEXT_DEDUP_THRESHOLD: float = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # Jaccard over problem terms
+    SOLUTION_SNIPPET_LENGTH: int = int(os.getenv("SOLUTION_SNIPPET_LENGTH", "600"))
+    KB_SEARCH_TIMEOUT: float = float(os.getenv("KB_SEARCH_TIMEOUT", "5"))  # seconds
+    WEB_SEARCH_TIMEOUT: float = float(os.getenv("WEB_SEARCH_TIMEOUT", "8"))  # seconds
+    SEARCH_EXECUTOR_WORKERS: int = int(os.getenv("SEARCH_EXECUTOR_WORKERS", "16"))  # threads shared by all agents in the process
+    SPECULATIVE_KB_SEARCH: bool = os.getenv("SPECULATIVE_KB_SEARCH", "true").lower() == "true"
+    LOCAL_ROUTER_ENABLED: bool = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+    LOCAL_ROUTER_THRESHOLD: float = float(os.getenv("LOCAL_ROUTER_THRESHOLD", "0.7"))  # below this the LLM router decides
+    LOCAL_ROUTER_TEMPERATURE: float = float(os.getenv("LOCAL_ROUTER_TEMPERATURE", "0.05"))
+    MAX_PROBLEMS_KB: int = int(os.getenv("MAX_PROBLEMS_KB", "1500"))  # -1 for no cap
+    EXACT_MATCH_ENABLED: bool = os.getenv("EXACT_MATCH_ENABLED", "true").lower() == "true"
+    EXACT_MATCH_INDEX_PATH: str = os.getenv("EXACT_MATCH_INDEX_PATH", ".cache/exact_match_index.json")
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_DIR: str = os.getenv("ANSWER_CACHE_DIR", ".cache/answer_cache")
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_MIN_CONFIDENCE: float = float(os.getenv("ANSWER_CACHE_MIN_CONFIDENCE", "0.8"))
+    ANSWER_CACHE_TTL_SECONDS: int = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    
+    # Ingestion
+    GSM8K_MAX_ROWS: int = int(os.getenv("GSM8K_MAX_ROWS", "1000"))  # -1 streams the whole dataset
+    MATH_MAX_ROWS: int = int(os.getenv("MATH_MAX_ROWS", "300"))
+    DATASET_SNAPSHOT_DIR: str = os.getenv("DATASET_SNAPSHOT_DIR", "data/snapshots")  # <name>.parquet overrides the HF download
+    KB_SNAPSHOT_PATH: str = os.getenv("KB_SNAPSHOT_PATH", "")  # prebuilt artifact; skips ingestion when present
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "4"))  # batches buffered between loading and encoding
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "0"))  # 0 or 1 = single process
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # exact Jaccard over character shingles
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "64"))
+    DEDUP_BANDS: int = int(os.getenv("DEDUP_BANDS", "8"))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
     
     @classmethod
     def validate_required_keys(cls):
@@ -0,0 +1,146 @@
+import hashlib
+import re
+import tempfile
+import zlib
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from src.config.settings import settings
+from src.knowledge_base.exact_match import normalize_problem_text, extract_numbers
+
+MERSENNE_PRIME = (1 << 31) - 1  # (a*x + b) stays below 2^63, so uint64 never wraps
+
+class NearDuplicateDetector:
+    """Streaming near-duplicate detection with MinHash signatures and LSH banding.
+
+    Each problem is reduced to character shingles of its normalized text and a
+    MinHash signature. Signatures are split into bands; problems sharing any
+    band bucket become candidates. A candidate only counts as a duplicate when
+    both problems use the same numbers, the exact Jaccard similarity of their
+    shingles clears the threshold, and their words differ only by insertions
+    or deletions. Shingle sets alone cannot tell "f is A. Prove f is B" from
+    its converse, or from "Prove f is C" when A, B and C are short words. Exact
+    checks read the candidate's normalized text back from a temporary file, so
+    only signatures stay in memory. Work per problem is proportional to its
+    bucket collisions, not to the corpus size.
+    """
+
+    def __init__(self, num_perm: Optional[int] = None, bands: Optional[int] = None,
+                 threshold: Optional[float] = None, shingle_size: int = 5, seed: int = 42):
+        self.num_perm = num_perm or settings.DEDUP_NUM_PERM
+        self.bands = bands or settings.DEDUP_BANDS
+        self.threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+        self.shingle_size = shingle_size
+
+        if self.num_perm % self.bands != 0:
+            raise ValueError("DEDUP_NUM_PERM must be divisible by DEDUP_BANDS")
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=(self.num_perm, 1), dtype=np.uint64)
+
+        self._exact: Dict[bytes, str] = {}  # Digest of the normalized text, so memory doesn't grow with text length
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._numbers: Dict[str, List[str]] = {}
+        self._texts = None  # Normalized texts on disk, read back for exact checks
+        self._spans: Dict[str, Tuple[int, int]] = {}
+
+    def grams(self, normalized: str) -> Set[str]:
+        """Overlapping character n-grams of a normalized text"""
+        if len(normalized) <= self.shingle_size:
+            return {normalized}
+        return {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+
+    def shingles(self, text: str) -> np.ndarray:
+        """32-bit hashes of overlapping character n-grams of the normalized text"""
+        grams = self.grams(normalize_problem_text(text))
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature using (a*x + b) mod p universal hashing over all permutations at once"""
+        prime = np.uint64(MERSENNE_PRIME)
+        shingles = self.shingles(text) % prime
+        hashed = (self._a * shingles[None, :] + self._b) % prime
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def similarity(self, text_a: str, text_b: str) -> float:
+        """Jaccard similarity estimated from the MinHash signatures"""
+        return float(np.mean(self.signature(text_a) == self.signature(text_b)))
+
+    def jaccard(self, text_a: str, text_b: str) -> float:
+        """Exact Jaccard similarity of the shingle sets"""
+        return self._jaccard(self.grams(normalize_problem_text(text_a)), self.grams(normalize_problem_text(text_b)))
+
+    def _jaccard(self, grams_a: Set[str], grams_b: Set[str]) -> float:
+        return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+    def only_insertions(self, normalized_a: str, normalized_b: str) -> bool:
+        """True when the word sequences differ only by inserted or deleted words.
+
+        A substituted word ("Prove f is odd" vs "Prove f is even") or a moved one
+        (a problem and its converse) makes a different problem, however similar
+        the shingle sets are.
+        """
+        words_a, words_b = re.findall(r"\w+", normalized_a), re.findall(r"\w+", normalized_b)
+        deleted, inserted = Counter(), Counter()
+        for tag, a_start, a_end, b_start, b_end in SequenceMatcher(None, words_a, words_b, autojunk=False).get_opcodes():
+            if tag == "replace":
+                return False
+            if tag != "equal":
+                deleted.update(words_a[a_start:a_end])
+                inserted.update(words_b[b_start:b_end])
+        return not deleted & inserted
+
+    def _store_text(self, key: str, normalized: str):
+        if self._texts is None:
+            self._texts = tempfile.TemporaryFile()
+        data = normalized.encode("utf-8")
+        offset = self._texts.seek(0, 2)
+        self._texts.write(data)
+        self._spans[key] = (offset, len(data))
+
+    def _read_text(self, key: str) -> str:
+        offset, length = self._spans[key]
+        self._texts.seek(offset)
+        return self._texts.read(length).decode("utf-8")
+
+    def add(self, key: str, text: str) -> Optional[str]:
+        """Insert a problem, or return the key of an already-seen near duplicate"""
+        normalized = normalize_problem_text(text)
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            return self._exact[digest]
+
+        signature = self.signature(text)
+        numbers = extract_numbers(text)
+        band_keys = [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+        checked = set()
+        grams = None
+        for band, band_key in enumerate(band_keys):
+            for candidate in self._buckets[band].get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self._numbers[candidate] != numbers:
+                    continue
+                # The MinHash estimate only nominates candidates; the exact checks decide
+                grams = grams or self.grams(normalized)
+                candidate_text = self._read_text(candidate)
+                if (self._jaccard(grams, self.grams(candidate_text)) >= self.threshold
+                        and self.only_insertions(normalized, candidate_text)):
+                    return candidate
+
+        self._exact[digest] = key
+        self._store_text(key, normalized)
+        self._signatures[key] = signature
+        self._numbers[key] = numbers
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band][band_key].append(key)
+        return None
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+class EmbeddingCache:
+    """Persistent content-addressed embedding cache.
+
+    Vectors live in a flat float32 file that is read through a memory map, and
+    a small JSON index maps sha256(model name, text) to a row in that file.
+    Rows are only ever appended, so a crash between writing vectors and saving
+    the index at worst leaves a few unreferenced rows behind. A torn append that
+    leaves a partial row is cut off on load, and new rows are always written at
+    the row-aligned end of the file.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.row_bytes = dimension * np.dtype(np.float32).itemsize
+
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.cache_dir / f"{safe_name}.f32"
+        self.index_path = self.cache_dir / f"{safe_name}.index.json"
+
+        self.index: Dict[str, int] = {}
+        self.num_rows = 0
+        self._matrix = None
+        self._dirty = False
+
+        # Hit/miss counters for the current process
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def _load(self):
+        """Load the index and drop entries pointing past the end of the vector file"""
+        if self.vectors_path.exists():
+            size = self.vectors_path.stat().st_size
+            self.num_rows = size // self.row_bytes
+            if size != self.num_rows * self.row_bytes:
+                print(f"⚠️ Truncating partial row at the end of {self.vectors_path}")
+                os.truncate(self.vectors_path, self.num_rows * self.row_bytes)
+
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as f:
+                    data = json.load(f)
+                if data.get("dimension") == self.dimension:
+                    self.index = {
+                        key: row for key, row in data.get("rows", {}).items()
+                        if row < self.num_rows
+                    }
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable embedding cache index: {e}")
+                self.index = {}
+
+    def _vectors(self) -> Optional[np.memmap]:
+        """Memory map of all rows currently on disk"""
+        if self.num_rows == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != self.num_rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(self.num_rows, self.dimension)
+            )
+        return self._matrix
+
+    def key(self, text: str) -> str:
+        """Content address for a text under the cached model"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors in input order, with None for misses"""
+        matrix = self._vectors()
+        results = []
+        for text in texts:
+            row = self.index.get(self.key(text))
+            if row is None or matrix is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                results.append(matrix[row].tolist())
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Append new vectors to the cache"""
+        new_keys = []
+        new_vectors = []
+        seen = set()
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            if key not in self.index and key not in seen:
+                seen.add(key)
+                new_keys.append(key)
+                new_vectors.append(vector)
+
+        if not new_vectors:
+            return
+
+        block = np.asarray(new_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        with open(self.vectors_path, "r+b" if self.vectors_path.exists() else "w+b") as f:
+            f.seek(self.num_rows * self.row_bytes)
+            f.write(block.tobytes())
+            f.truncate()
+
+        for offset, key in enumerate(new_keys):
+            self.index[key] = self.num_rows + offset
+        self.num_rows += len(new_keys)
+        self._dirty = True
+
+    def save(self):
+        """Atomically persist the index file"""
+        if not self._dirty:
+            return
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model_name, "dimension": self.dimension, "rows": self.index}, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
@@ -0,0 +1,236 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+import numpy as np
+from src.config.settings import settings
+from src.knowledge_base.embedding_cache import EmbeddingCache
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+class EmbeddingPipeline:
+    """Batched document embedding, optionally fanned out over a process pool"""
+
+    def __init__(self, model: "SentenceTransformer", batch_size: Optional[int] = None,
+                 num_workers: Optional[int] = None, cache: Optional[EmbeddingCache] = None):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.num_workers = settings.EMBEDDING_WORKERS if num_workers is None else num_workers
+        self.pool = None
+
+        # Throughput counters
+        self.total_embedded = 0
+        self.total_seconds = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """Start the multi-process pool when more than one worker is configured"""
+        # The ONNX backend parallelizes inside the runtime via intra-op threads instead
+        if self.num_workers > 1 and self.pool is None and hasattr(self.model, "start_multi_process_pool"):
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_workers)
+            print(f"⚙️ Started embedding pool with {self.num_workers} workers")
+
+    def stop(self):
+        """Shut down the process pool and flush the embedding cache"""
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+        if self.cache is not None:
+            self.cache.save()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts, reusing cached vectors and only running the model on misses"""
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._encode(texts)
+
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self._encode(missing_texts)
+            self.cache.put_many(missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return vectors
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Run the model over texts in batches and return plain float lists"""
+        start_time = time.time()
+        if self.pool is not None:
+            vectors = self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+
+        self.total_seconds += time.time() - start_time
+        self.total_embedded += len(texts)
+        return [vector.tolist() for vector in vectors]
+
+    @property
+    def embeddings_per_second(self) -> float:
+        """Average encoding throughput since the pipeline was created"""
+        if self.total_seconds == 0:
+            return 0.0
+        return self.total_embedded / self.total_seconds
+
+class OnnxSentenceEmbedder:
+    """Sentence embedder running an exported ONNX MiniLM on onnxruntime.
+
+    Reproduces the sentence-transformers pipeline (transformer, mean pooling,
+    L2 normalization) without the torch runtime, and exposes the subset of the
+    SentenceTransformer interface the knowledge base uses.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, intra_op_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        with open(self.model_dir / "config.json") as f:
+            config = json.load(f)
+        self.dimension = config["dimension"]
+        self.max_seq_length = config["max_seq_length"]
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 0), pad_token=config.get("pad_token", "[PAD]"))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = settings.ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+
+        model_file = "model_quantized.onnx" if quantized else "model.onnx"
+        self.session = ort.InferenceSession(
+            str(self.model_dir / model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Embed one text or a list of texts into L2-normalized float32 vectors"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+                "attention_mask": attention_mask,
+                "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+            }
+            token_embeddings = self.session.run(
+                None, {name: value for name, value in feeds.items() if name in self.input_names}
+            )[0]
+
+            # Mean pooling over real tokens, then normalize like the 2_Normalize module
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            outputs.append(pooled.astype(np.float32))
+
+        vectors = np.vstack(outputs)
+        return vectors[0] if single else vectors
+
+def load_embedding_model():
+    """Build the sentence embedder selected by settings.EMBEDDING_BACKEND"""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return OnnxSentenceEmbedder(settings.ONNX_MODEL_DIR, quantized=settings.ONNX_QUANTIZED)
+    if settings.EMBEDDING_BACKEND == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(settings.EMBEDDING_MODEL)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {settings.EMBEDDING_BACKEND}")
+
+def embedding_model_id() -> str:
+    """Identifier for cached document vectors; int8 ONNX vectors differ slightly from torch ones"""
+    if settings.EMBEDDING_BACKEND == "onnx" and settings.ONNX_QUANTIZED:
+        return f"{settings.EMBEDDING_MODEL}+onnx-int8"
+    return settings.EMBEDDING_MODEL
+
+def embedding_parity(reference, candidate, texts: List[str]) -> Dict[str, float]:
+    """Cosine agreement between two embedders on the same texts"""
+    expected = np.asarray(reference.encode(texts), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts), dtype=np.float32)
+    expected /= np.maximum(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12)
+    actual /= np.maximum(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12)
+    cosines = (expected * actual).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "max_abs_diff": float(np.abs(expected - actual).max())
+    }
+
+class QueryEmbeddingCache:
+    """Bounded, thread-safe LRU cache of query embeddings keyed by normalized text"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = settings.QUERY_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Collapse whitespace and case; the MiniLM tokenizer is uncased anyway"""
+        return " ".join(query.split()).lower()
+
+    def get(self, query: str) -> Optional[List[float]]:
+        key = self.normalize(query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: List[float]):
+        if self.max_size <= 0:
+            return
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SUPERSCRIPTS = str.maketrans({
+    "⁰": "^0", "¹": "^1", "²": "^2", "³": "^3", "⁴": "^4",
+    "⁵": "^5", "⁶": "^6", "⁷": "^7", "⁸": "^8", "⁹": "^9",
+    "⁺": "^+", "⁻": "^-", "ⁿ": "^n",
+    "₀": "_0", "₁": "_1", "₂": "_2", "₃": "_3", "₄": "_4",
+    "₅": "_5", "₆": "_6", "₇": "_7", "₈": "_8", "₉": "_9",
+    "−": "-", "·": "*", "×": "*", "÷": "/"
+})
+
+LATEX_REPLACEMENTS = [
+    (r"\\(left|right|displaystyle|textstyle|!|,|;|:|quad|qquad)", ""),
+    (r"\\(cdot|times)", "*"),
+    (r"\\div", "/"),
+    (r"\\(le|leq)\b", "<="),
+    (r"\\(ge|geq)\b", ">="),
+    (r"\\(ne|neq)\b", "!="),
+    (r"\\(text|mathrm|mathbf|operatorname)\s*", ""),
+    (r"\\[\(\)\[\]]", ""),
+    (r"\\sqrt", "√"),
+    (r"\\pi\b", "π"),
+    (r"\\", ""),
+]
+
+def normalize_problem_text(text: str) -> str:
+    """Canonical form of a problem for exact matching.
+
+    Case, whitespace and unicode super/subscripts are folded, and common LaTeX
+    markup is reduced so that "x²" and "$x^{2}$" normalize to the same string.
+    Braces and whitespace between two alphanumerics become a "|" separator
+    rather than vanishing, so "\\frac{1}{23}" and "\\frac{12}{3}", or "10 20"
+    and "1020", stay distinct.
+    """
+    text = text.translate(SUPERSCRIPTS)
+    text = unicodedata.normalize("NFKC", text)
+    for pattern, replacement in LATEX_REPLACEMENTS:
+        text = re.sub(pattern, replacement, text)
+    text = text.casefold().replace("$", "")
+    text = re.sub(r"(?<=\w)[{}\s]+(?=\w)", "|", text)
+    text = re.sub(r"[{}\s]", "", text)
+    return text.rstrip(".?!")
+
+def extract_numbers(text: str) -> List[str]:
+    """Sorted numeric literals of a problem; problems with different numbers are different problems"""
+    return sorted(re.findall(r"\d+(?:\.\d+)?", normalize_problem_text(text)))
+
+def problem_hash(text: str) -> str:
+    """Stable hash of the normalized problem text"""
+    return hashlib.sha256(normalize_problem_text(text).encode("utf-8")).hexdigest()
+
+class ExactMatchIndex:
+    """Hash index from normalized problem text to the point ID of the stored problem.
+
+    Only IDs are kept, so the index stays small however long the solutions are;
+    the solution itself is fetched from the vector store on a hit.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+            if any("id" not in entry for entry in self.entries.values()):
+                print("⚠️ Exact-match index predates point IDs, it is rebuilt by the next setup or sync")
+                self.entries = {}
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable exact-match index: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Atomically persist the index"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.entries = {}
+
+    def add(self, point_id: str, problem: Dict):
+        """Index a problem, keeping the first one seen for each normalized text"""
+        self.entries.setdefault(problem_hash(problem["problem"]), {
+            "id": point_id,
+            "source": problem["source"]
+        })
+
+    def rebuild(self, points: Iterable[Tuple[str, Dict]]):
+        """Replace the index with one entry per (point ID, problem) pair"""
+        self.clear()
+        for point_id, problem in points:
+            self.add(point_id, problem)
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        return self.entries.get(problem_hash(question))
@@ -0,0 +1,254 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, PointIdsList, Filter, FieldCondition, MatchValue, QueryRequest,
+    SearchParams, QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, Disabled, VectorParamsDiff
+)
+from src.config.settings import settings
+from src.knowledge_base.vector_store import PayloadSelector
+
+_qdrant_client: Optional[QdrantClient] = None
+_async_qdrant_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[AsyncQdrantClient, AsyncIterator]]" = weakref.WeakKeyDictionary()
+_qdrant_client_lock = threading.Lock()
+
+def _qdrant_client_options() -> Dict[str, Any]:
+    return {
+        "url": settings.QDRANT_URL,
+        "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+        "grpc_port": settings.QDRANT_GRPC_PORT,
+        "timeout": settings.QDRANT_TIMEOUT
+    }
+
+def get_qdrant_client() -> QdrantClient:
+    """Process-wide Qdrant client; its connection pool is shared by every caller"""
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_client_lock:
+            if _qdrant_client is None:
+                _qdrant_client = QdrantClient(**_qdrant_client_options())
+    return _qdrant_client
+
+async def _close_with_loop(loop: asyncio.AbstractEventLoop, client: AsyncQdrantClient) -> AsyncIterator[None]:
+    """Parked for the loop's lifetime; the loop's shutdown_asyncgens() resumes it to close the client"""
+    try:
+        yield
+    finally:
+        _async_qdrant_clients.pop(loop, None)
+        await client.close()
+
+async def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Shared async Qdrant client for the running event loop.
+
+    Async connections are bound to the loop that opened them, so there is one
+    pooled client per loop rather than one per process. The client is closed
+    when its loop shuts down, so asyncio.run() per request leaves no open pool.
+    """
+    loop = asyncio.get_running_loop()
+    with _qdrant_client_lock:
+        entry = _async_qdrant_clients.get(loop)
+        if entry is None:
+            client = AsyncQdrantClient(**_qdrant_client_options())
+            closer = _close_with_loop(loop, client)
+            _async_qdrant_clients[loop] = (client, closer)
+    if entry is not None:
+        return entry[0]
+    # Starting the generator registers it with the loop's async generator hooks
+    await closer.asend(None)
+    return client
+
+class QdrantVectorStore:
+    """Vector store backed by a Qdrant server"""
+
+    def __init__(self, collection_name: str, dimension: int):
+        self.collection_name = collection_name
+        self.dimension = dimension
+        self.client = get_qdrant_client()
+
+    def _quantization_config(self):
+        """Qdrant quantization config for settings.VECTOR_QUANTIZATION"""
+        if settings.VECTOR_QUANTIZATION == "int8":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if settings.VECTOR_QUANTIZATION == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _search_params(self, exact: bool = False) -> Optional[SearchParams]:
+        """Rescore oversampled quantized candidates with the original vectors"""
+        if exact:
+            return SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+        if settings.VECTOR_QUANTIZATION == "none":
+            return None
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=settings.QUANTIZATION_OVERSAMPLING
+            )
+        )
+
+    def create_collection(self):
+        """Create Qdrant collection, or bring an existing one in line with VECTOR_QUANTIZATION"""
+        quantization_config = self._quantization_config()
+        if self.client.collection_exists(self.collection_name):
+            print(f"Collection {self.collection_name} already exists")
+            # Switching back to "none" must remove the old quantization, and on_disk follows it
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": VectorParamsDiff(on_disk=quantization_config is not None)},
+                quantization_config=quantization_config or Disabled.DISABLED
+            )
+            print(f"✅ Applied {settings.VECTOR_QUANTIZATION} quantization to existing collection")
+            return
+
+        try:
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                # Full-precision vectors only serve rescoring, so they can live on disk
+                vectors_config=VectorParams(
+                    size=self.dimension,
+                    distance=Distance.COSINE,
+                    on_disk=quantization_config is not None
+                ),
+                quantization_config=quantization_config
+            )
+            print("✅ Created new Qdrant collection")
+        except Exception as e:
+            print(f"Collection may already exist: {e}")
+
+    def delete_collection(self):
+        self.client.delete_collection(self.collection_name)
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict]):
+        points = [
+            PointStruct(id=point_id, vector=vector, payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+
+    def delete(self, ids: List[str]):
+        for batch_start in range(0, len(ids), settings.UPSERT_BATCH_SIZE):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=ids[batch_start:batch_start + settings.UPSERT_BATCH_SIZE])
+            )
+
+    def fetch_field(self, field: str) -> Dict[str, Any]:
+        """Map every point ID to a single payload field"""
+        values = {}
+        offset = None
+
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=[field],
+                with_vectors=False
+            )
+            for record in records:
+                values[str(record.id)] = (record.payload or {}).get(field)
+            if offset is None:
+                break
+
+        return values
+
+    def _topic_filter(self, topic_filter: Optional[str]) -> Optional[Filter]:
+        if not topic_filter:
+            return None
+        return Filter(must=[FieldCondition(key="topic", match=MatchValue(value=topic_filter))])
+
+    def _query_kwargs(self, vector: List[float], limit: int, topic_filter: Optional[str],
+                      with_payload: PayloadSelector) -> Dict[str, Any]:
+        return {
+            "collection_name": self.collection_name,
+            "query": vector,
+            "query_filter": self._topic_filter(topic_filter),
+            "search_params": self._search_params(),
+            "limit": limit,
+            "with_payload": with_payload
+        }
+
+    def _hits(self, points) -> List[Dict]:
+        return [{"id": str(hit.id), "score": hit.score, "payload": hit.payload} for hit in points]
+
+    def search(self, vector: List[float], limit: int, topic_filter: Optional[str] = None,
+               with_payload: PayloadSelector = True) -> List[Dict]:
+        response = self.client.query_points(**self._query_kwargs(vector, limit, topic_filter, with_payload))
+        return self._hits(response.points)
+
+    async def asearch(self, vector: List[float], limit: int, topic_filter: Optional[str] = None,
+                      with_payload: PayloadSelector = True) -> List[Dict]:
+        """search() on the shared async client, without blocking the event loop"""
+        client = await get_async_qdrant_client()
+        response = await client.query_points(**self._query_kwargs(vector, limit, topic_filter, with_payload))
+        return self._hits(response.points)
+
+    def search_batch(self, vectors: List[List[float]], limit: int, topic_filter: Optional[str] = None,
+                     exact: bool = False, with_payload: PayloadSelector = True) -> List[List[Dict]]:
+        """Run several searches in a single request, returning results in query order.
+
+        exact=True bypasses both the HNSW graph and quantization, for recall checks.
+        """
+        if len(vectors) == 0:
+            return []
+        query_filter = self._topic_filter(topic_filter)
+        params = self._search_params(exact)
+        requests = [
+            QueryRequest(query=vector, filter=query_filter, limit=limit, with_payload=with_payload, params=params)
+            for vector in vectors
+        ]
+        responses = self.client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        return [self._hits(response.points) for response in responses]
+
+    def retrieve(self, ids: List[str], with_payload: PayloadSelector = True) -> List[Dict]:
+        """Fetch points by ID, without vectors"""
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+        return [{"id": str(record.id), "payload": record.payload} for record in records]
+
+    def scroll_points(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], np.ndarray, List[Dict]]]:
+        """Yield every point as (ids, vectors, payloads) batches"""
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                yield (
+                    [str(record.id) for record in records],
+                    np.asarray([record.vector for record in records], dtype=np.float32),
+                    [record.payload or {} for record in records]
+                )
+            if offset is None:
+                break
+
+    def bulk_upload(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict]):
+        """Upload many points at once with client-side batching and parallel requests"""
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=vectors,
+            payload=payloads,
+            ids=ids,
+            batch_size=settings.UPSERT_BATCH_SIZE,
+            parallel=max(1, min(4, os.cpu_count() or 1)),
+            wait=True
+        )
+
+    def flush(self):
+        """Writes are durable on the server as soon as upsert returns"""
+        pass
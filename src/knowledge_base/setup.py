@@ -1,96 +1,165 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
-from datasets import load_dataset
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import itertools
+import queue
+import threading
 import uuid
 import json
-from typing import List, Dict, Optional
+import time
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
+import numpy as np
 from src.config.settings import settings
 from src.knowledge_base.curated_problems import ALL_CURATED_PROBLEMS
+from src.knowledge_base.embeddings import EmbeddingPipeline, QueryEmbeddingCache, load_embedding_model, embedding_model_id
+from src.knowledge_base.embedding_cache import EmbeddingCache
+from src.knowledge_base.exact_match import ExactMatchIndex
+from src.knowledge_base.dedup import NearDuplicateDetector
+from src.knowledge_base.snapshot import read_snapshot, write_snapshot
+
+# Payload fields returned by search; full solutions are fetched on demand
+SEARCH_PAYLOAD_FIELDS = ["problem", "solution_snippet", "solution_truncated", "topic", "difficulty", "source"]
 
 class MathKnowledgeBase:
     def __init__(self):
-        self.client = QdrantClient(settings.QDRANT_URL)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Heavy dependencies (torch or onnxruntime, Qdrant client) load here rather than at import time
+        from src.knowledge_base.vector_store import create_vector_store
+        
+        self.model = load_embedding_model()
         self.collection_name = "math_knowledge_hybrid"
+        self.store = create_vector_store(self.collection_name, self.model.get_sentence_embedding_dimension())
+        self.embedding_cache = None
+        self.query_cache = QueryEmbeddingCache()
+        self.exact_index = ExactMatchIndex(settings.EXACT_MATCH_INDEX_PATH)
+        self.dropped_duplicates = []
+        self.failed_sources: List[str] = []  # sources whose last load raised partway or entirely
+        self.warned_missing_snippets = False
         
-    def setup_collection(self):
-        """Create Qdrant collection if it doesn't exist"""
-        try:
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+    def get_embedding_cache(self) -> Optional[EmbeddingCache]:
+        """On-disk cache of document embeddings shared across rebuilds"""
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return None
+        if self.embedding_cache is None:
+            self.embedding_cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_DIR,
+                embedding_model_id(),
+                self.model.get_sentence_embedding_dimension()
             )
-            print("✅ Created new Qdrant collection")
-        except Exception as e:
-            print(f"Collection may already exist: {e}")
+        return self.embedding_cache
+    
+    def setup_collection(self):
+        """Create the vector collection if it doesn't exist"""
+        self.store.create_collection()
     
     def load_public_datasets(self) -> List[Dict]:
         """Load free public math datasets"""
-        all_problems = []
+        return list(self.iter_public_problems())
+    
+    def iter_public_problems(self) -> Iterator[Dict]:
+        """Stream public math datasets within their per-source row budgets"""
+        if settings.HUGGINGFACE_TOKEN:
+            from huggingface_hub import login
+            login(token=settings.HUGGINGFACE_TOKEN)
+        
+        yield from self.iter_gsm8k(settings.GSM8K_MAX_ROWS)
+        yield from self.iter_competition_math(settings.MATH_MAX_ROWS)
+    
+    def iter_dataset_rows(self, snapshot_name: str, loader: Callable, max_rows: int) -> Iterator[Dict]:
+        """Rows from a local Parquet snapshot if present, else from the cached Hugging Face Arrow files.
+        
+        Both are read incrementally, so memory use does not grow with the dataset.
+        A negative max_rows streams every row.
+        """
+        if max_rows == 0:
+            return
+        limit = None if max_rows < 0 else max_rows
         
-        # Try to load GSM8K dataset
+        snapshot = Path(settings.DATASET_SNAPSHOT_DIR) / f"{snapshot_name}.parquet"
+        if snapshot.exists():
+            import pyarrow.parquet as pq
+            print(f"✅ Using local snapshot: {snapshot}")
+            rows = (
+                row
+                for batch in pq.ParquetFile(snapshot).iter_batches(batch_size=1000)
+                for row in batch.to_pylist()
+            )
+            yield from itertools.islice(rows, limit)
+            return
+        
+        dataset = loader()
+        count = len(dataset) if limit is None else min(limit, len(dataset))
+        yield from dataset.select(range(count))
+    
+    def iter_gsm8k(self, max_rows: int) -> Iterator[Dict]:
+        """Stream GSM8K problems"""
         try:
             print("📚 Loading GSM8K dataset...")
-            if settings.HUGGINGFACE_TOKEN:
-                from huggingface_hub import login
-                login(token=settings.HUGGINGFACE_TOKEN)
-            
-            gsm8k = load_dataset("gsm8k", "main", split="train")
-            
-            # Take first 1000 problems for speed
-            for i, item in enumerate(gsm8k.select(range(min(1000, len(gsm8k))))):
-                all_problems.append({
+            count = 0
+            rows = self.iter_dataset_rows(
+                "gsm8k", lambda: self.load_hf_dataset("gsm8k", "main"), max_rows
+            )
+            for i, item in enumerate(rows):
+                yield {
                     "problem": item['question'],
                     "solution": self.format_gsm8k_solution(item['answer']),
                     "topic": "word_problems",
                     "difficulty": "basic",
                     "source": "gsm8k",
                     "problem_id": f"gsm8k_{i}"
-                })
+                }
+                count += 1
             
-            print(f"✅ Loaded {len(all_problems)} GSM8K problems")
+            print(f"✅ Loaded {count} GSM8K problems")
             
         except Exception as e:
+            self.failed_sources.append("gsm8k")
             print(f"❌ Failed to load GSM8K: {e}")
             print("📝 Will use curated problems only")
+    
+    def load_hf_dataset(self, name: str, config: Optional[str] = None):
+        """Load a Hugging Face dataset split, importing the datasets library on demand"""
+        from datasets import load_dataset
+        return load_dataset(name, config, split="train")
+    
+    def load_competition_math(self):
+        """Load MATH competition dataset, trying each known name"""
+        # Try different possible dataset names
+        dataset_names = ["hendrycks/competition_math", "competition_math", "hendrycks_math"]
+        
+        for name in dataset_names:
+            try:
+                math_dataset = self.load_hf_dataset(name)
+                print(f"✅ Found dataset: {name}")
+                return math_dataset
+            except:
+                continue
         
-        # Try to load MATH competition dataset with correct name
+        raise Exception("Could not find MATH competition dataset with any known name")
+    
+    def iter_competition_math(self, max_rows: int) -> Iterator[Dict]:
+        """Stream MATH competition problems"""
         try:
             print("📚 Loading MATH competition dataset...")
-            # Try different possible dataset names
-            dataset_names = ["hendrycks/competition_math", "competition_math", "hendrycks_math"]
-            
-            math_dataset = None
-            for name in dataset_names:
-                try:
-                    math_dataset = load_dataset(name, split="train")
-                    print(f"✅ Found dataset: {name}")
-                    break
-                except:
-                    continue
-            
-            if math_dataset is None:
-                raise Exception("Could not find MATH competition dataset with any known name")
-            
-            # Take 300 problems for variety
-            for i, item in enumerate(math_dataset.select(range(min(300, len(math_dataset))))):
-                all_problems.append({
+            count = 0
+            rows = self.iter_dataset_rows("competition_math", self.load_competition_math, max_rows)
+            for i, item in enumerate(rows):
+                yield {
                     "problem": item['problem'],
                     "solution": item['solution'],
                     "topic": item['type'].lower().replace(" ", "_"),
                     "difficulty": self.map_competition_difficulty(item['level']),
                     "source": "competition_math",
                     "problem_id": f"math_{i}"
-                })
+                }
+                count += 1
             
-            print(f"✅ Loaded 300 MATH competition problems")
+            print(f"✅ Loaded {count} MATH competition problems")
             
         except Exception as e:
+            self.failed_sources.append("competition_math")
             print(f"❌ Failed to load MATH dataset: {e}")
             print("📝 Continuing with GSM8K and curated problems only")
-        
-        return all_problems
     
     def format_gsm8k_solution(self, answer: str) -> str:
         """Format GSM8K solutions to be more step-by-step"""
@@ -118,6 +187,28 @@ class MathKnowledgeBase:
         }
         return mapping.get(level, "intermediate")
     
+    def iter_problems(self) -> Iterator[Dict]:
+        """Stream curated and public problems, de-duplicated and capped at MAX_PROBLEMS_KB (-1 for no cap)"""
+        self.failed_sources = []
+        all_problems = itertools.chain(ALL_CURATED_PROBLEMS, self.iter_public_problems())
+        unique_problems = self.iter_unique_problems(all_problems)
+        if settings.MAX_PROBLEMS_KB < 0:
+            return unique_problems
+        return self.iter_capped(unique_problems, settings.MAX_PROBLEMS_KB)
+    
+    def iter_capped(self, problems: Iterator[Dict], limit: int) -> Iterator[Dict]:
+        """The first limit problems, announcing when the cap cuts the stream short"""
+        count = 0
+        for problem in itertools.islice(problems, limit):
+            yield problem
+            count += 1
+        if count == limit:
+            print(f"⚠️ Stopped at MAX_PROBLEMS_KB={limit}; set it to -1 to ingest every loaded row")
+    
+    def collect_problems(self) -> List[Dict]:
+        """Load every data source and return the de-duplicated problem list"""
+        return list(self.iter_problems())
+    
     def setup_knowledge_base(self) -> int:
         """Setup complete knowledge base with all data sources"""
         print("🚀 Setting up hybrid math knowledge base...")
@@ -125,113 +216,442 @@ class MathKnowledgeBase:
         # Setup collection
         self.setup_collection()
         
-        # Load all data sources
-        public_problems = self.load_public_datasets()
-        curated_problems = ALL_CURATED_PROBLEMS
+        # Stream load -> dedup -> embed -> upsert
+        self.exact_index.clear()
+        num_problems = self.batch_insert_problems(self.index_exact(self.iter_problems()))
+        self.save_exact_index()
+        
+        print(f"✅ Knowledge base setup complete with {num_problems} problems")
+        return num_problems
+    
+    def sync_knowledge_base(self, problems: Optional[Iterable[Dict]] = None) -> Dict[str, int]:
+        """Incrementally sync the collection, upserting and deleting only the delta.
+        
+        Point IDs and content hashes are deterministic, so the diff is recomputed
+        from scratch on every run and an interrupted sync simply resumes. Rows of
+        a source that failed to load are never treated as stale, so a dataset
+        outage cannot delete that source's problems.
+        """
+        print("🔄 Syncing hybrid math knowledge base...")
+        
+        self.setup_collection()
+        
+        self.failed_sources = []
+        if problems is None:
+            problems = self.iter_problems()
+        
+        existing = self.store.fetch_field("content_hash")
+        seen_ids = set()
+        
+        # Every live problem is exact-match indexed, changed or not
+        previous_entries = self.exact_index.entries
+        self.exact_index.clear()
+        indexed_problems = self.index_exact(problems)
         
-        # Combine all problems
-        all_problems = curated_problems + public_problems
+        def changed_problems() -> Iterator[Dict]:
+            for problem in indexed_problems:
+                point_id = self.point_id(problem)
+                seen_ids.add(point_id)
+                if existing.get(point_id) != self.content_hash(problem):
+                    yield problem
         
-        # Remove duplicates
-        unique_problems = self.remove_duplicates(all_problems)
+        # Upsert before deleting so a crash never leaves the collection missing live rows
+        upserted = self.batch_insert_problems(changed_problems())
+        stale_ids = [point_id for point_id in existing if point_id not in seen_ids]
+        kept_ids = []
+        if stale_ids and self.failed_sources:
+            sources = self.store.fetch_field("source")
+            kept_ids = [point_id for point_id in stale_ids if sources.get(point_id) in self.failed_sources]
+            stale_ids = [point_id for point_id in stale_ids if sources.get(point_id) not in self.failed_sources]
+            print(f"⚠️ Kept {len(kept_ids)} problems from failed sources: {', '.join(self.failed_sources)}")
+        for key, entry in previous_entries.items():
+            if entry["source"] in self.failed_sources:
+                self.exact_index.entries.setdefault(key, entry)
         
-        print(f"📊 Processing {len(unique_problems)} unique problems...")
+        if stale_ids:
+            self.store.delete(stale_ids)
+            self.store.flush()
+            print(f"🗑️ Deleted {len(stale_ids)} stale problems")
         
-        # Batch insert
-        self.batch_insert_problems(unique_problems)
+        self.save_exact_index()
+        
+        print(f"📊 {len(seen_ids)} problems: {upserted} new or changed, "
+              f"{len(seen_ids) - upserted} unchanged, {len(stale_ids)} stale")
+        print("✅ Knowledge base sync complete")
+        return {
+            "total": len(seen_ids),
+            "upserted": upserted,
+            "deleted": len(stale_ids),
+            "unchanged": len(seen_ids) - upserted,
+            "kept": len(kept_ids),
+            "failed_sources": list(self.failed_sources)
+        }
+    
+    def export_snapshot(self, path: str) -> Dict:
+        """Write the processed collection (IDs, payloads, vectors) to a snapshot artifact"""
+        ids, vectors, payloads = [], [], []
+        for batch_ids, batch_vectors, batch_payloads in self.store.scroll_points():
+            ids.extend(batch_ids)
+            vectors.append(batch_vectors)
+            payloads.extend(batch_payloads)
         
-        print(f"✅ Knowledge base setup complete with {len(unique_problems)} problems")
-        return len(unique_problems)
+        dimension = self.model.get_sentence_embedding_dimension()
+        matrix = np.concatenate(vectors) if vectors else np.zeros((0, dimension), dtype=np.float32)
+        manifest = write_snapshot(path, ids, matrix, payloads, {
+            "collection": self.collection_name,
+            "embedding_model": embedding_model_id()
+        })
+        print(f"📦 Exported {manifest['count']} problems to {path}")
+        return manifest
+    
+    def import_snapshot(self, path: str) -> int:
+        """Replace the collection with a snapshot artifact, without re-embedding.
+        
+        The snapshot must come from the same embedding model, since queries are
+        still encoded locally. The exact-match index is rebuilt from its payloads.
+        """
+        manifest, ids, vectors, payloads = read_snapshot(path)
+        
+        if manifest["embedding_model"] != embedding_model_id():
+            raise ValueError(
+                f"Snapshot was built with {manifest['embedding_model']}, "
+                f"but this system embeds queries with {embedding_model_id()}"
+            )
+        if manifest["dimension"] != self.model.get_sentence_embedding_dimension():
+            raise ValueError(f"Snapshot dimension {manifest['dimension']} does not match the embedding model")
+        
+        start_time = time.perf_counter()
+        self.store.delete_collection()
+        self.setup_collection()
+        self.store.bulk_upload(ids, vectors, payloads)
+        
+        self.exact_index.rebuild(zip(ids, payloads))
+        self.save_exact_index()
+        
+        print(f"📦 Imported {len(ids)} problems from {path} in {time.perf_counter() - start_time:.1f}s")
+        return len(ids)
+    
+    def index_exact(self, problems: Iterable[Dict]) -> Iterator[Dict]:
+        """Add problems to the exact-match index as they stream past"""
+        for problem in problems:
+            self.exact_index.add(self.point_id(problem), problem)
+            yield problem
+    
+    def save_exact_index(self):
+        """Persist the normalized-text hash index used by the exact-match fast path"""
+        self.exact_index.save()
+        print(f"🔑 Exact-match index holds {len(self.exact_index.entries)} problems")
+    
+    def lookup_exact(self, question: str) -> Optional[Dict]:
+        """Return the stored problem whose normalized text equals the question"""
+        entry = self.exact_index.lookup(question)
+        if entry is None:
+            return None
+        try:
+            records = self.store.retrieve([entry["id"]], with_payload=["problem", "solution", "topic", "difficulty", "source"])
+        except Exception as e:
+            print(f"Exact-match fetch failed: {e}")
+            return None
+        return records[0]["payload"] if records else None
+    
+    def point_id(self, problem: Dict) -> str:
+        """Deterministic point ID from problem_id, or from the problem text when there is none"""
+        key = problem.get('problem_id')
+        if not key:
+            key = f"{problem['source']}:{hashlib.sha256(problem['problem'].strip().encode('utf-8')).hexdigest()}"
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.collection_name}/{key}"))
+    
+    def content_hash(self, problem: Dict) -> str:
+        """Hash of everything stored for a problem, used to detect changed rows"""
+        content = json.dumps(
+            {"embedding_model": settings.EMBEDDING_MODEL, "snippet_length": settings.SOLUTION_SNIPPET_LENGTH, **problem},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
     
     def remove_duplicates(self, problems: List[Dict]) -> List[Dict]:
-        """Remove duplicate problems based on text similarity"""
-        seen_problems = set()
-        unique_problems = []
+        """Remove near-duplicate problems using MinHash signatures with LSH banding"""
+        return list(self.iter_unique_problems(problems))
+    
+    def iter_unique_problems(self, problems: Iterable[Dict]) -> Iterator[Dict]:
+        """Stream problems, dropping near duplicates of ones already seen"""
+        detector = NearDuplicateDetector()
+        self.dropped_duplicates = []
         
         for problem in problems:
-            # Create a hash based on first 100 chars of problem
-            problem_hash = problem['problem'].strip().lower()[:100]
+            key = problem.get('problem_id') or self.point_id(problem)
+            duplicate_of = detector.add(key, problem['problem'])
+            if duplicate_of is None:
+                yield problem
+                continue
             
-            if problem_hash not in seen_problems:
-                seen_problems.add(problem_hash)
-                unique_problems.append(problem)
+            self.dropped_duplicates.append((key, duplicate_of))
+            if len(self.dropped_duplicates) <= 10:
+                print(f"🧹 Dropped near duplicate {key} ~ {duplicate_of}")
         
-        return unique_problems
+        if len(self.dropped_duplicates) > 10:
+            print(f"🧹 Dropped {len(self.dropped_duplicates)} near-duplicate problems in total")
     
-    def batch_insert_problems(self, problems: List[Dict]):
-        """Insert problems in batches for efficiency"""
-        batch_size = 100
-        points = []
-        
-        for i, problem in enumerate(problems):
-            # Create rich search text
-            search_text = f"""
+    def build_snippet(self, problem: Dict) -> Dict:
+        """Precomputed truncated solution so retrieval never has to ship the full text"""
+        solution = problem['solution']
+        return {
+            "solution_snippet": solution[:settings.SOLUTION_SNIPPET_LENGTH],
+            "solution_truncated": len(solution) > settings.SOLUTION_SNIPPET_LENGTH
+        }
+    
+    def build_search_text(self, problem: Dict) -> str:
+        """Create rich search text for embedding a problem"""
+        search_text = f"""
             Problem: {problem['problem']}
             Solution: {problem['solution']}
             Topic: {problem['topic']}
             Difficulty: {problem['difficulty']}
             Source: {problem['source']}
             """
+        return search_text.strip()
+    
+    def batch_insert_problems(self, problems: Iterable[Dict]) -> int:
+        """Insert problems in batches, pipelining loading, encoding and vector store upserts.
+        
+        A producer thread pulls problems into a bounded queue of batches while the
+        caller's thread encodes, and at most one upsert is in flight, so memory
+        stays flat no matter how long the input stream is.
+        """
+        batch_size = settings.UPSERT_BATCH_SIZE
+        batches = queue.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        producer_errors = []
+        
+        def produce():
+            try:
+                iterator = iter(problems)
+                while True:
+                    batch = list(itertools.islice(iterator, batch_size))
+                    if not batch:
+                        break
+                    batches.put(batch)
+            except Exception as e:
+                producer_errors.append(e)
+            finally:
+                batches.put(None)
+        
+        producer = threading.Thread(target=produce, name="kb-ingest-loader", daemon=True)
+        start_time = time.time()
+        total = 0
+        pending_upsert = None
+        
+        with EmbeddingPipeline(self.model, cache=self.get_embedding_cache()) as pipeline, ThreadPoolExecutor(max_workers=1) as uploader:
+            producer.start()
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                
+                # Encode the whole batch in one pass while the previous upsert is in flight
+                vectors = pipeline.encode([self.build_search_text(problem) for problem in batch])
+                
+                # Deterministic UUIDs keep re-runs idempotent regardless of dataset order
+                ids = [self.point_id(problem) for problem in batch]
+                payloads = [
+                    {
+                        **problem,
+                        **self.build_snippet(problem),
+                        "original_id": problem.get('problem_id', point_id),  # Store original ID in payload
+                        "content_hash": self.content_hash(problem)
+                    }
+                    for problem, point_id in zip(batch, ids)
+                ]
+                
+                # Keep at most one upsert in flight so memory stays bounded
+                if pending_upsert is not None:
+                    pending_upsert.result()
+                pending_upsert = uploader.submit(self.store.upsert, ids, vectors, payloads)
+                total += len(batch)
+                print(f"📝 Encoded batch ending at problem {total} "
+                      f"({pipeline.embeddings_per_second:.1f} embeddings/sec)")
             
-            # Generate embedding
-            vector = self.model.encode(search_text.strip()).tolist()
-            
-            # Use integer ID instead of string (Qdrant requirement)
-            points.append(PointStruct(
-                id=i,  # Use integer ID instead of string
-                vector=vector,
-                payload={
-                    **problem,
-                    "original_id": problem.get('problem_id', f"problem_{i}")  # Store original ID in payload
-                }
-            ))
-            
-            # Insert batch when full
-            if len(points) >= batch_size:
-                self.client.upsert(collection_name=self.collection_name, points=points)
-                points = []
-                print(f"📝 Uploaded batch ending at problem {i+1}")
-        
-        # Insert remaining points
-        if points:
-            self.client.upsert(collection_name=self.collection_name, points=points)
-            print(f"📝 Uploaded final batch of {len(points)} problems")
-    
-    def search(self, query: str, limit: int = 5, topic_filter: Optional[str] = None) -> List[Dict]:
-        """Search knowledge base with optional topic filtering"""
+            if pending_upsert is not None:
+                pending_upsert.result()
+        
+        producer.join()
+        if producer_errors:
+            raise producer_errors[0]
+        
+        self.store.flush()
+        elapsed = time.time() - start_time
+        if total:
+            print(f"📝 Uploaded {total} problems in {elapsed:.1f}s "
+                  f"({total / max(elapsed, 1e-9):.1f} problems/sec end-to-end, "
+                  f"{pipeline.embeddings_per_second:.1f} embeddings/sec encoding)")
+            if pipeline.cache is not None:
+                print(f"💾 Embedding cache: {pipeline.cache.hits} reused, {pipeline.cache.misses} encoded")
+        return total
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing recent encodes of the same text"""
+        vector = self.query_cache.get(query)
+        if vector is None:
+            vector = self.model.encode(query).tolist()
+            self.query_cache.put(query, vector)
+        return vector
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries, encoding all cache misses in one batched forward pass"""
+        vectors = [self.query_cache.get(query) for query in queries]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        
+        if missing:
+            encoded = self.model.encode([queries[i] for i in missing], batch_size=settings.EMBEDDING_BATCH_SIZE)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector.tolist()
+                self.query_cache.put(queries[i], vectors[i])
+        
+        return vectors
+    
+    def format_hit(self, hit: Dict) -> Dict:
+        """Convert a vector store hit into a search result"""
+        payload = hit["payload"]
+        snippet = payload if "solution_snippet" in payload else self.build_snippet({"solution": payload.get("solution", "")})
+        result = {
+            "id": hit["id"],
+            "problem": payload["problem"],
+            "solution_snippet": snippet["solution_snippet"],
+            "solution_truncated": snippet["solution_truncated"],
+            "topic": payload["topic"],
+            "difficulty": payload["difficulty"],
+            "source": payload["source"],
+            "score": hit["score"]
+        }
+        if "solution" in payload:
+            result["solution"] = payload["solution"]
+        return result
+    
+    def format_hits(self, hits: List[Dict]) -> List[Dict]:
+        """format_hit() for a result list, fetching solutions for points stored without a snippet"""
+        missing = [hit["id"] for hit in hits if "solution_snippet" not in hit["payload"] and "solution" not in hit["payload"]]
+        if missing:
+            # Collection predates precomputed snippets; sync_knowledge_base() rewrites those points
+            if not self.warned_missing_snippets:
+                print("⚠️ Collection has no solution snippets, run scripts/sync_knowledge_base.py to add them")
+                self.warned_missing_snippets = True
+            solutions = self.get_solutions(missing)
+            hits = [
+                {**hit, "payload": {**hit["payload"], "solution": solutions[hit["id"]]}} if hit["id"] in solutions else hit
+                for hit in hits
+            ]
+        return [self.format_hit(hit) for hit in hits]
+    
+    def payload_fields(self, full_solution: bool) -> List[str]:
+        """Payload fields to fetch for search results"""
+        return SEARCH_PAYLOAD_FIELDS + (["solution"] if full_solution else [])
+    
+    def get_solutions(self, point_ids: List[str]) -> Dict[str, str]:
+        """Fetch full solution texts by point ID"""
+        records = self.store.retrieve(point_ids, with_payload=["solution"])
+        return {record["id"]: record["payload"]["solution"] for record in records}
+    
+    def search(self, query: str, limit: int = 5, topic_filter: Optional[str] = None,
+               full_solution: bool = False, raise_errors: bool = False) -> List[Dict]:
+        """Search knowledge base with optional topic filtering.
+        
+        Results carry a precomputed solution snippet; pass full_solution=True, or
+        call get_solutions() with result IDs, when the complete text is needed.
+        Failures return no results unless raise_errors is set.
+        """
         try:
-            query_vector = self.model.encode(query).tolist()
+            query_vector = self.embed_query(query)
+            
+            results = self.store.search(
+                query_vector, limit, topic_filter, with_payload=self.payload_fields(full_solution)
+            )
             
-            search_params = {
-                "collection_name": self.collection_name,
-                "query_vector": query_vector,
-                "limit": limit
-            }
+            return self.format_hits(results)
             
-            # Add topic filter if specified
-            if topic_filter:
-                from qdrant_client.models import Filter, FieldCondition, MatchValue
-                search_params["query_filter"] = Filter(
-                    must=[FieldCondition(key="topic", match=MatchValue(value=topic_filter))]
-                )
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Search failed: {e}")
+            return []
+    
+    async def asearch(self, query: str, limit: int = 5, topic_filter: Optional[str] = None,
+                      full_solution: bool = False, raise_errors: bool = False) -> List[Dict]:
+        """Async search(): the query is encoded in a worker thread and the vector store awaited"""
+        try:
+            query_vector = await asyncio.to_thread(self.embed_query, query)
             
-            results = self.client.search(**search_params)
+            results = await self.store.asearch(
+                query_vector, limit, topic_filter, with_payload=self.payload_fields(full_solution)
+            )
             
-            return [
-                {
-                    "problem": hit.payload["problem"],
-                    "solution": hit.payload["solution"],
-                    "topic": hit.payload["topic"],
-                    "difficulty": hit.payload["difficulty"],
-                    "source": hit.payload["source"],
-                    "score": hit.score
-                }
-                for hit in results
-            ]
+            if any("solution_snippet" not in hit["payload"] for hit in results):
+                return await asyncio.to_thread(self.format_hits, results)
+            return self.format_hits(results)
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Search failed: {e}")
             return []
+    
+    def search_many(self, queries: List[str], limit: int = 5, topic_filter: Optional[str] = None,
+                    full_solution: bool = False) -> List[List[Dict]]:
+        """Search for several queries at once, returning per-query results in order"""
+        try:
+            query_vectors = self.embed_queries(queries)
+            
+            results = self.store.search_batch(
+                query_vectors, limit, topic_filter, with_payload=self.payload_fields(full_solution)
+            )
+            
+            return [self.format_hits(hits) for hits in results]
+            
+        except Exception as e:
+            print(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+
+    def measure_recall(self, queries: List[str], limit: int = 10) -> Dict[str, float]:
+        """Recall@limit of the configured search (quantized or approximate) against exact search"""
+        query_vectors = self.embed_queries(queries)
+        
+        start_time = time.time()
+        approximate = self.store.search_batch(query_vectors, limit, with_payload=False)
+        approximate_seconds = time.time() - start_time
+        
+        start_time = time.time()
+        exact = self.store.search_batch(query_vectors, limit, exact=True, with_payload=False)
+        exact_seconds = time.time() - start_time
+        
+        recalls = []
+        for approximate_hits, exact_hits in zip(approximate, exact):
+            if not exact_hits:
+                continue
+            exact_ids = {hit["id"] for hit in exact_hits}
+            recalls.append(len(exact_ids & {hit["id"] for hit in approximate_hits}) / len(exact_ids))
+        
+        return {
+            "queries": len(recalls),
+            "limit": limit,
+            "recall": sum(recalls) / len(recalls) if recalls else 0.0,
+            "approximate_ms_per_query": approximate_seconds * 1000 / max(len(queries), 1),
+            "exact_ms_per_query": exact_seconds * 1000 / max(len(queries), 1)
+        }
+
+# Global instance, created on first use
+_math_kb: Optional[MathKnowledgeBase] = None
+_math_kb_lock = threading.Lock()
+
+def get_math_kb() -> MathKnowledgeBase:
+    """Return the shared knowledge base, loading the model and vector store on first call"""
+    global _math_kb
+    if _math_kb is None:
+        with _math_kb_lock:
+            if _math_kb is None:
+                _math_kb = MathKnowledgeBase()
+    return _math_kb
 
-# Global instance
-math_kb = MathKnowledgeBase()
\ No newline at end of file
+def __getattr__(name: str):
+    # Keeps `from src.knowledge_base.setup import math_kb` working, lazily
+    if name == "math_kb":
+        return get_math_kb()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Bump when the artifact layout changes; readers reject versions they don't know
+SNAPSHOT_FORMAT_VERSION = 1
+
+def write_snapshot(path: str, ids: List[str], vectors: np.ndarray, payloads: List[Dict], metadata: Dict) -> Dict:
+    """Write a knowledge base snapshot and return its manifest.
+
+    The artifact is a single zip holding a JSON manifest, the point IDs,
+    payloads stored column by column, and the vectors as one raw little-endian
+    float16 block. Vectors are stored uncompressed so they load with a single
+    read; the JSON members are deflated.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="<f2")
+    vector_bytes = vectors.tobytes()
+
+    fields = sorted({field for payload in payloads for field in payload})
+    columns = {field: [payload.get(field) for payload in payloads] for field in fields}
+    # Record which rows actually carry each field so None values survive the round trip
+    present = {
+        field: [row for row, payload in enumerate(payloads) if field in payload]
+        for field in fields
+    }
+
+    manifest = {
+        **metadata,
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "count": len(ids),
+        "dimension": int(vectors.shape[1]),
+        "vector_dtype": "float16",
+        "vectors_sha256": hashlib.sha256(vector_bytes).hexdigest(),
+        "payload_fields": fields
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        zf.writestr("ids.json", json.dumps(ids))
+        zf.writestr("payloads.json", json.dumps({"columns": columns, "present": present}, ensure_ascii=False))
+        zf.writestr("vectors.f16", vector_bytes, compress_type=zipfile.ZIP_STORED)
+    tmp_path.replace(path)
+    return manifest
+
+def read_manifest(path: str) -> Dict:
+    with zipfile.ZipFile(path) as zf:
+        return json.loads(zf.read("manifest.json"))
+
+def read_snapshot(path: str) -> Tuple[Dict, List[str], np.ndarray, List[Dict]]:
+    """Load a snapshot written by write_snapshot(), verifying its format and checksum"""
+    with zipfile.ZipFile(path) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format {manifest.get('format_version')}, "
+                f"expected {SNAPSHOT_FORMAT_VERSION}"
+            )
+
+        vector_bytes = zf.read("vectors.f16")
+        if hashlib.sha256(vector_bytes).hexdigest() != manifest["vectors_sha256"]:
+            raise ValueError("Snapshot vectors are corrupt (checksum mismatch)")
+
+        ids = json.loads(zf.read("ids.json"))
+        columnar = json.loads(zf.read("payloads.json"))
+
+    count = manifest["count"]
+    vectors = np.frombuffer(vector_bytes, dtype="<f2").reshape(count, manifest["dimension"]).astype(np.float32)
+
+    payloads = [{} for _ in range(count)]
+    for field, values in columnar["columns"].items():
+        for row in columnar["present"][field]:
+            payloads[row][field] = values[row]
+
+    if len(ids) != count:
+        raise ValueError("Snapshot is inconsistent: ID count does not match manifest")
+    return manifest, ids, vectors, payloads
@@ -0,0 +1,368 @@
+import asyncio
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from src.config.settings import settings
+
+# Qdrant-style payload selector: True for everything, False for nothing, or a list of fields
+PayloadSelector = Union[bool, List[str]]
+
+# Topic filters matching fewer rows than this share of the index bypass HNSW for an exact scan
+ANN_FILTER_MIN_FRACTION = 0.1
+
+# Number of set bits in every byte value, for Hamming distance over packed codes
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+
+class LocalVectorStore:
+    """In-process vector index over a memory-mapped NumPy matrix.
+
+    Vectors are L2-normalized on insert so a dot product equals the cosine
+    similarity Qdrant would report. Upserts and deletes are staged in memory
+    and applied by flush(), which rewrites the matrix once instead of per batch.
+    Staged upserts are also applied whenever LOCAL_INDEX_FLUSH_ROWS accumulate,
+    so long ingestions do not hold every vector in memory; the HNSW graph is
+    only rebuilt by the explicit flush() at the end.
+    With LOCAL_INDEX_ANN enabled and hnswlib installed, large collections are
+    also served from an HNSW graph; otherwise search is a matrix product.
+
+    With VECTOR_QUANTIZATION set, that product runs over compact int8 or
+    packed binary codes held in RAM, and only the oversampled top candidates
+    are rescored against the full-precision matrix, which stays on disk.
+    """
+
+    def __init__(self, collection_name: str, dimension: int, index_dir: Optional[str] = None):
+        self.collection_name = collection_name
+        self.dimension = dimension
+        self.dir = Path(index_dir or settings.LOCAL_INDEX_DIR) / collection_name
+        self.vectors_path = self.dir / "vectors.npy"
+        self.payloads_path = self.dir / "payloads.jsonl"
+        self.ann_path = self.dir / "ann.bin"
+        self.codes_path = self.dir / f"codes.{settings.VECTOR_QUANTIZATION}.npy"
+        self.scale_path = self.dir / "codes.int8.scale.npy"
+        self._lock = threading.RLock()
+        self._ann_unavailable = False  # hnswlib import failed once; don't retry per search
+        self._load()
+
+    def _load(self):
+        """Open the on-disk index, or start empty"""
+        self.ids: List[str] = []
+        self.payloads: List[Dict] = []
+        self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+        if self.vectors_path.exists() and self.payloads_path.exists():
+            with open(self.payloads_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.ids.append(record["id"])
+                    self.payloads.append(record["payload"])
+            self.matrix = np.load(self.vectors_path, mmap_mode="r")
+
+            if self.matrix.shape[0] != len(self.ids):
+                print(f"⚠️ Local index {self.collection_name} is inconsistent, starting empty")
+                self.ids, self.payloads = [], []
+                self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+        self.row_of = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.topics = np.array([payload.get("topic") for payload in self.payloads], dtype=object)
+        self._pending: Dict[str, tuple] = {}
+        self._deleted = set()
+        self.ann = self._load_ann()
+        self.codes, self.scale = self._load_codes()
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def create_collection(self):
+        """Create the index directory if it doesn't exist"""
+        if self.payloads_path.exists():
+            print(f"Collection may already exist: {self.dir}")
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._write([], [], [], [])
+        print("✅ Created new local vector index")
+
+    def delete_collection(self):
+        with self._lock:
+            for path in (self.vectors_path, self.payloads_path, self.ann_path, self.codes_path, self.scale_path):
+                if path.exists():
+                    path.unlink()
+            self._load()
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict]):
+        with self._lock:
+            normalized = self._normalize(np.asarray(vectors, dtype=np.float32))
+            for point_id, vector, payload in zip(ids, normalized, payloads):
+                self._deleted.discard(point_id)
+                self._pending[point_id] = (vector, payload)
+            if len(self._pending) >= settings.LOCAL_INDEX_FLUSH_ROWS:
+                self._apply(build_ann=False)
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for point_id in ids:
+                self._pending.pop(point_id, None)
+                if point_id in self.row_of:
+                    self._deleted.add(point_id)
+
+    def fetch_field(self, field: str) -> Dict[str, Any]:
+        """Map every point ID to a single payload field"""
+        with self._lock:
+            self.flush()
+            return {point_id: payload.get(field) for point_id, payload in zip(self.ids, self.payloads)}
+
+    def scroll_points(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], np.ndarray, List[Dict]]]:
+        """Yield every point as (ids, vectors, payloads) batches"""
+        with self._lock:
+            self.flush()
+            ids, matrix, payloads = self.ids, self.matrix, self.payloads
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            yield ids[start:end], np.asarray(matrix[start:end], dtype=np.float32), payloads[start:end]
+
+    def bulk_upload(self, ids: List[str], vectors: np.ndarray, payloads: List[Dict]):
+        """Stage all points and write the index once"""
+        self.upsert(ids, vectors, payloads)
+        self.flush()
+
+    def flush(self):
+        """Apply staged upserts and deletes and persist the index"""
+        self._apply(build_ann=True)
+
+    def _apply(self, build_ann: bool):
+        with self._lock:
+            if self._pending or self._deleted:
+                keep = [
+                    row for row, point_id in enumerate(self.ids)
+                    if point_id not in self._deleted and point_id not in self._pending
+                ]
+                ids = [self.ids[row] for row in keep] + list(self._pending.keys())
+                payloads = [self.payloads[row] for row in keep] + [payload for _, payload in self._pending.values()]
+                pending_vectors = [vector for vector, _ in self._pending.values()]
+
+                self.dir.mkdir(parents=True, exist_ok=True)
+                self._write(ids, payloads, keep, pending_vectors)
+                self._load()
+            if build_ann and self.ann is None and self._ann_wanted() and not self._ann_unavailable:
+                self.ann = self._build_ann()
+
+    def _write(self, ids: List[str], payloads: List[Dict], keep: List[int], pending_vectors: List[np.ndarray]):
+        """Atomically replace the vector and payload files, copying kept rows in chunks"""
+        tmp_vectors = self.dir / "vectors.tmp.npy"
+        tmp_payloads = self.dir / "payloads.tmp.jsonl"
+        if ids:
+            matrix = np.lib.format.open_memmap(tmp_vectors, mode="w+", dtype=np.float32, shape=(len(ids), self.dimension))
+            for start in range(0, len(keep), 65536):
+                rows = keep[start:start + 65536]
+                matrix[start:start + len(rows)] = self.matrix[rows]
+            if pending_vectors:
+                matrix[len(keep):] = np.stack(pending_vectors)
+            matrix.flush()
+            del matrix
+        else:
+            np.save(tmp_vectors, np.zeros((0, self.dimension), dtype=np.float32))
+        with open(tmp_payloads, "w") as f:
+            for point_id, payload in zip(ids, payloads):
+                f.write(json.dumps({"id": point_id, "payload": payload}, ensure_ascii=False) + "\n")
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_payloads, self.payloads_path)
+        for path in (self.ann_path, self.codes_path, self.scale_path):
+            if path.exists():
+                path.unlink()
+
+    def _ann_wanted(self) -> bool:
+        return settings.LOCAL_INDEX_ANN and len(self.ids) >= settings.LOCAL_INDEX_ANN_MIN_ROWS
+
+    def _load_ann(self):
+        """Load a persisted HNSW graph if one matches the current matrix"""
+        if not self._ann_wanted() or not self.ann_path.exists():
+            return None
+        try:
+            import hnswlib
+            index = hnswlib.Index(space="ip", dim=self.dimension)
+            index.load_index(str(self.ann_path), max_elements=len(self.ids))
+            if index.get_current_count() != len(self.ids):
+                return None
+            index.set_ef(settings.LOCAL_INDEX_ANN_EF)
+            return index
+        except ImportError:
+            return None
+
+    def _build_ann(self):
+        """Build and persist an HNSW graph over the current matrix"""
+        try:
+            import hnswlib
+        except ImportError:
+            print("⚠️ hnswlib not installed, using exact local search")
+            self._ann_unavailable = True
+            return None
+
+        index = hnswlib.Index(space="ip", dim=self.dimension)
+        index.init_index(max_elements=len(self.ids), ef_construction=200, M=16)
+        index.add_items(np.asarray(self.matrix), np.arange(len(self.ids)))
+        index.set_ef(settings.LOCAL_INDEX_ANN_EF)
+        index.save_index(str(self.ann_path))
+        print(f"✅ Built approximate index over {len(self.ids)} vectors")
+        return index
+
+    def _load_codes(self):
+        """Load or build the quantized copy of the matrix for the configured mode"""
+        mode = settings.VECTOR_QUANTIZATION
+        if mode == "none" or not self.ids:
+            return None, None
+
+        if self.codes_path.exists():
+            codes = np.load(self.codes_path)
+            scale = np.load(self.scale_path) if mode == "int8" and self.scale_path.exists() else None
+            if codes.shape[0] == len(self.ids) and (mode != "int8" or scale is not None):
+                return codes, scale
+
+        if mode == "int8":
+            # Symmetric per-dimension scale at the 99th percentile of |x|; Qdrant's
+            # scalar quantization instead takes one quantile range for the whole collection
+            scale = np.quantile(np.abs(np.asarray(self.matrix)), 0.99, axis=0).astype(np.float32)
+            scale = np.maximum(scale, 1e-6)
+            codes = np.vstack([
+                np.clip(np.rint(np.asarray(self.matrix[start:start + 65536]) / scale * 127), -127, 127).astype(np.int8)
+                for start in range(0, len(self.ids), 65536)
+            ])
+            np.save(self.scale_path, scale)
+        elif mode == "binary":
+            scale = None
+            codes = np.vstack([
+                np.packbits(np.asarray(self.matrix[start:start + 65536]) > 0, axis=1)
+                for start in range(0, len(self.ids), 65536)
+            ])
+        else:
+            raise ValueError(f"Unknown VECTOR_QUANTIZATION: {mode}")
+
+        np.save(self.codes_path, codes)
+        return codes, scale
+
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray, scale: Optional[np.ndarray]) -> np.ndarray:
+        """Similarity of every query to every row using only the quantized codes"""
+        scores = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        if scale is not None:
+            scaled = (queries * scale / 127).T
+            for start in range(0, codes.shape[0], 65536):
+                chunk = codes[start:start + 65536].astype(np.float32)
+                scores[:, start:start + 65536] = (chunk @ scaled).T
+        else:
+            query_bits = np.packbits(queries > 0, axis=1)
+            for i, bits in enumerate(query_bits):
+                for start in range(0, codes.shape[0], 65536):
+                    differing = POPCOUNT[np.bitwise_xor(codes[start:start + 65536], bits)].sum(axis=1)
+                    scores[i, start:start + 65536] = -differing
+        return scores
+
+    def _top_k(self, scores: np.ndarray, k: int):
+        """Row indices and scores of the k best entries of each score row, best first"""
+        rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, rows, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def _project(self, payload: Dict, with_payload: PayloadSelector) -> Optional[Dict]:
+        """Apply a Qdrant-style payload selector to a stored payload"""
+        if with_payload is True:
+            return payload
+        if not with_payload:
+            return None
+        return {field: payload[field] for field in with_payload if field in payload}
+
+    def retrieve(self, ids: List[str], with_payload: PayloadSelector = True) -> List[Dict]:
+        """Fetch points by ID"""
+        with self._lock:
+            self.flush()
+            return [
+                {"id": point_id, "payload": self._project(self.payloads[self.row_of[point_id]], with_payload)}
+                for point_id in ids
+                if point_id in self.row_of
+            ]
+
+    def search(self, vector: List[float], limit: int, topic_filter: Optional[str] = None,
+               with_payload: PayloadSelector = True) -> List[Dict]:
+        return self.search_batch([vector], limit, topic_filter, with_payload=with_payload)[0]
+
+    async def asearch(self, vector: List[float], limit: int, topic_filter: Optional[str] = None,
+                      with_payload: PayloadSelector = True) -> List[Dict]:
+        """search() in a worker thread; the in-process index has no network I/O to await"""
+        return await asyncio.to_thread(self.search, vector, limit, topic_filter, with_payload)
+
+    def search_batch(self, vectors: List[List[float]], limit: int, topic_filter: Optional[str] = None,
+                     exact: bool = False, with_payload: PayloadSelector = True) -> List[List[Dict]]:
+        """Score all queries against the index in one matrix product.
+
+        exact=True bypasses both the HNSW graph and quantization, for recall checks.
+        """
+        # Scoring runs on one consistent snapshot, so a concurrent upsert can't mix old and new rows
+        with self._lock:
+            self.flush()
+            ids, payloads, matrix, topics = self.ids, self.payloads, self.matrix, self.topics
+            ann, codes, scale = self.ann, self.codes, self.scale
+        if not ids or limit <= 0:
+            return [[] for _ in vectors]
+        if len(vectors) == 0:
+            return []
+
+        queries = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        k = min(limit, len(ids))
+        topic_mask = topics == topic_filter if topic_filter else None
+        selective = False
+        if topic_mask is not None:
+            matched = int(topic_mask.sum())
+            if matched == 0:
+                return [[] for _ in queries]
+            # hnswlib cannot return more rows than match the filter, and degrades on selective ones
+            k = min(k, matched)
+            selective = matched < ANN_FILTER_MIN_FRACTION * len(ids)
+
+        if ann is not None and not exact and not selective:
+            label_filter = None
+            if topic_filter:
+                label_filter = lambda row: topics[row] == topic_filter
+            rows, distances = ann.knn_query(queries, k=k, filter=label_filter)
+            scores = 1.0 - distances
+        elif codes is not None and not exact:
+            approximate = self._approximate_scores(queries, codes, scale)
+            if topic_mask is not None:
+                approximate = np.where(topic_mask, approximate, -np.inf)
+            candidates, _ = self._top_k(approximate, min(len(ids), int(np.ceil(k * settings.QUANTIZATION_OVERSAMPLING))))
+
+            # Rescore candidates with full-precision vectors read from the memory map
+            candidates = np.sort(candidates, axis=1)
+            rescored = np.stack([
+                np.asarray(matrix[query_rows]) @ query
+                for query_rows, query in zip(candidates, queries)
+            ])
+            if topic_mask is not None:
+                rescored = np.where(topic_mask[candidates], rescored, -np.inf)
+            order, scores = self._top_k(rescored, k)
+            rows = np.take_along_axis(candidates, order, axis=1)
+        else:
+            all_scores = queries @ matrix.T
+            if topic_mask is not None:
+                all_scores = np.where(topic_mask, all_scores, -np.inf)
+            rows, scores = self._top_k(all_scores, k)
+
+        return [
+            [
+                {"id": ids[row], "score": float(score), "payload": self._project(payloads[row], with_payload)}
+                for row, score in zip(query_rows, query_scores)
+                if np.isfinite(score)
+            ]
+            for query_rows, query_scores in zip(rows, scores)
+        ]
+
+def create_vector_store(collection_name: str, dimension: int):
+    """Build the vector store selected by settings.VECTOR_BACKEND"""
+    if settings.VECTOR_BACKEND == "local":
+        return LocalVectorStore(collection_name, dimension)
+    if settings.VECTOR_BACKEND == "qdrant":
+        # qdrant-client is only needed, and only imported, for the server backend
+        from src.knowledge_base.qdrant_store import QdrantVectorStore
+        return QdrantVectorStore(collection_name, dimension)
+    raise ValueError(f"Unknown VECTOR_BACKEND: {settings.VECTOR_BACKEND}")
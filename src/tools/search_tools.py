@@ -1,13 +1,25 @@
 from langchain_core.tools import tool
-from duckduckgo_search import DDGS
-from typing import List, Dict
+from typing import List, Dict, Optional
+import asyncio
+import threading
 import time
 
+# The tool shows shorter solutions than the agent's KB results, to keep tool output small
+TOOL_SOLUTION_LENGTH = 500
+
 class WebSearchTool:
     """Free web search using DuckDuckGo"""
     
     def __init__(self):
-        self.ddg = DDGS()
+        self._ddg = None
+    
+    @property
+    def ddg(self):
+        """DuckDuckGo client, created on first search"""
+        if self._ddg is None:
+            from duckduckgo_search import DDGS
+            self._ddg = DDGS()
+        return self._ddg
     
     def search_mathematics(self, query: str, max_results: int = 3) -> str:
         """Search for mathematics content on the web"""
@@ -35,23 +47,29 @@ class WebSearchTool:
             
         except Exception as e:
             return f"Web search failed: {str(e)}"
+    
+    async def asearch_mathematics(self, query: str, max_results: int = 3) -> str:
+        """Async search_mathematics(); the DuckDuckGo client is blocking, so it runs in a worker thread"""
+        return await asyncio.to_thread(self.search_mathematics, query, max_results)
 
 @tool
 def search_knowledge_base(query: str) -> str:
     """Search the internal math knowledge base for relevant problems and solutions."""
     try:
-        from src.knowledge_base.setup import math_kb
+        from src.knowledge_base.setup import get_math_kb
         
-        results = math_kb.search(query, limit=3)
+        results = get_math_kb().search(query, limit=3)
         
         if not results:
             return "No relevant problems found in knowledge base."
         
         formatted_results = []
         for result in results:
+            snippet = result['solution_snippet'][:TOOL_SOLUTION_LENGTH]
+            truncated = result['solution_truncated'] or len(result['solution_snippet']) > TOOL_SOLUTION_LENGTH
             formatted_results.append(
                 f"Problem: {result['problem']}\n"
-                f"Solution: {result['solution'][:500]}{'...' if len(result['solution']) > 500 else ''}\n"
+                f"Solution: {snippet}{'...' if truncated else ''}\n"
                 f"Topic: {result['topic']} | Difficulty: {result['difficulty']}\n"
                 f"Source: {result['source']} | Relevance: {result['score']:.2f}\n"
                 f"---"
@@ -65,8 +83,17 @@ def search_knowledge_base(query: str) -> str:
 @tool
 def search_web(query: str) -> str:
     """Search the web for current mathematics information and research."""
-    web_tool = WebSearchTool()
-    return web_tool.search_mathematics(query)
+    return get_web_search_tool().search_mathematics(query)
+
+# Global instance, created on first use
+_web_search_tool: Optional[WebSearchTool] = None
+_web_search_tool_lock = threading.Lock()
 
-# Global instances
-web_search_tool = WebSearchTool()
\ No newline at end of file
+def get_web_search_tool() -> WebSearchTool:
+    """Return the shared web search tool"""
+    global _web_search_tool
+    if _web_search_tool is None:
+        with _web_search_tool_lock:
+            if _web_search_tool is None:
+                _web_search_tool = WebSearchTool()
+    return _web_search_tool
\ No newline at end of file